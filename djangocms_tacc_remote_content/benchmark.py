@@ -0,0 +1,178 @@
+"""
+Synthetic content and helpers to benchmark rendering remote content.
+
+See the `benchmark_remote_content` management command.
+"""
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Sizes (in KB) of pages to benchmark
+PAGE_SIZES = (10, 100, 500, 2000)
+
+# Selectors of elements whose relative URLs to keep, of which to benchmark
+# lists of several lengths (see `get_selectors`)
+SELECTORS = (
+    '.pagination a',
+    '[data-keep-relative]',
+    'img.local-asset',
+    'a[href^="/docs/"]',
+    '.docs-section img[src*="local"]',
+    'nav.breadcrumb a',
+    'article .byline a',
+    'figure > img',
+)
+
+PAGE_HEAD = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>News | Texas Advanced Computing Center</title>
+<link rel="stylesheet" href="/static/site_cms/css/build/site.css">
+<script src="/static/site_cms/js/site.js"></script>
+</head>
+<body>
+<header><nav class="navbar">
+<a href="/" class="navbar-brand"><img src="/media/filer_public/tacc-logo.svg" alt="TACC"></a>
+<a href="/about/">About</a> <a href="/research/">Research</a> <a href="/news/">News</a>
+</nav></header>
+<main><nav class="breadcrumb"><a href="/">Home</a> / <a href="/news/">News</a></nav>
+'''
+
+PAGE_FOOT = '''<nav class="pagination"><a href="?page=2">Next &gt;</a></nav>
+</main>
+<footer><a href="https://www.utexas.edu/">UT Austin</a> <a href="/contact/">Contact</a></footer>
+</body>
+</html>
+'''
+
+def build_article(rng, index):
+    """Build a TACC-style news article, with a random count of links and images"""
+    slug = f"story-{index}"
+    widths = (576, 768, 992, 1200, 1600)[:rng.randint(1, 5)]
+    srcset = ', '.join(f"/media/filer_public/{slug}-{width}.jpg {width}w" for width in widths)
+    links = ' '.join(
+        f'<a href="/news/{slug}/related-{link}/">related story {link}</a>'
+        for link in range(rng.randint(1, 6))
+    )
+    figure_class = ' class="docs-section"' if index % 7 == 0 else ''
+    image_class = ' class="local-asset"' if index % 5 == 0 else ''
+    return (
+        f'<article class="c-article-list__item" id="{slug}">\n'
+        f'<figure{figure_class}><img{image_class} src="/media/filer_public/{slug}.jpg" '
+        f'srcset="{srcset}" sizes="(min-width: 992px) 50vw, 100vw" alt="Photo {index}"></figure>\n'
+        f'<h2><a href="/news/{slug}/">Headline of story {index}</a></h2>\n'
+        f'<p class="byline">By <a href="/staff/writer-{index % 9}/">Writer {index % 9}</a> '
+        f'on <time datetime="2026-01-01">January 1, 2026</time></p>\n'
+        f'<p>Summary of story {index}, which is about supercomputing. {links} '
+        f'See <a href="/docs/guide-{index}/" data-keep-relative>the guide</a> '
+        f'or <a href="https://portal.tacc.utexas.edu/">the portal</a> '
+        f'or <a href="#{slug}">this story</a>.</p>\n'
+        f'</article>\n'
+    )
+
+def build_page(size_kb, seed=0):
+    """Build a TACC-style page of news articles, of (at least) a size"""
+    rng = random.Random(seed)
+    parts = [PAGE_HEAD]
+    size = len(PAGE_HEAD) + len(PAGE_FOOT)
+    index = 0
+    while size < size_kb * 1024:
+        article = build_article(rng, index)
+        parts.append(article)
+        size += len(article)
+        index += 1
+    parts.append(PAGE_FOOT)
+    return ''.join(parts)
+
+def build_srcset(count):
+    """Build a srcset of relative URLs, of a count of candidates"""
+    return ', '.join(f"/media/filer_public/photo-{index}.jpg {index * 100 + 100}w" for index in range(count))
+
+def get_selectors(count):
+    """Get a list of selectors, of a length"""
+    return [SELECTORS[index % len(SELECTORS)] for index in range(count)]
+
+def measure(function, repeat=5, number=1):
+    """
+    Time a function, like `timeit`.
+
+    Args:
+        repeat: How many samples to take
+        number: How many times to call function per sample
+
+    Returns:
+        Statistics of seconds per call, across samples
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'max': max(samples),
+        'samples': len(samples),
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results to baseline results, by median.
+
+    Returns:
+        A list of (name, ratio of result to baseline, whether it regressed),
+        for each benchmark in both
+    """
+    comparisons = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['median'] / baseline[name]['median']
+        comparisons.append((name, ratio, ratio > 1 + tolerance))
+    return comparisons
+
+class StubServerHandler(BaseHTTPRequestHandler):
+    """Serve a page of a size given by path (e.g. "/100/"), after a delay"""
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        time.sleep(float(parse_qs(parts.query).get('delay', [0])[0]))
+        body = self.server.get_page(int(parts.path.strip('/'))).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    """A local server of synthetic pages, in a background thread"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubServerHandler)
+        self.pages = {}
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/"
+
+    def get_page(self, size_kb):
+        if size_kb not in self.pages:
+            self.pages[size_kb] = build_page(size_kb)
+        return self.pages[size_kb]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,87 @@
+"""
+Circuit breaker per remote origin, so a failing origin fails fast.
+
+- closed: requests are sent; consecutive failures are counted
+- open: after `PORTAL_PLUGIN_CONTENT_BREAKER_THRESHOLD` failures, requests
+  are not sent, for `PORTAL_PLUGIN_CONTENT_BREAKER_COOLDOWN` seconds
+- half-open: after cooldown, one request (across processes) is sent; if it
+  succeeds, the breaker closes, else it opens again
+
+State is shared across processes via the cache. While open, each process
+also remembers until when, so it need not ask the cache again.
+"""
+import logging
+import time
+
+from . import cache
+from .client import get_origin, get_timeout
+from .conf import get_setting
+
+logger = logging.getLogger(f"portal.{__name__}")
+
+# Until when (timestamp) breaker of each origin is known to be open
+_open_until = {}
+
+def is_enabled():
+    return bool(get_setting('BREAKER_THRESHOLD'))
+
+def get_state_timeout():
+    """Get how long to remember failures, so old failures are forgotten"""
+    return get_setting('BREAKER_COOLDOWN') * 2
+
+def allow_request(url):
+    """Whether to send a request to the origin of a URL"""
+    if not is_enabled():
+        return True
+
+    origin = get_origin(url)
+    now = time.time()
+    if _open_until.get(origin, 0) > now:
+        return False
+
+    state = cache.get_entry('breaker', origin)
+    if not state or state['opened_at'] is None:
+        return True
+
+    open_until = state['opened_at'] + get_setting('BREAKER_COOLDOWN')
+    if now < open_until:
+        _open_until[origin] = open_until
+        return False
+
+    # Half-open: let only one request try the origin
+    is_trial = cache.add_entry('breaker-trial', origin, True, sum(get_timeout()))
+    if is_trial:
+        logger.info(f"Trying {origin} again after circuit breaker opened")
+    return is_trial
+
+def record_success(url):
+    """Close breaker of the origin of a URL"""
+    if not is_enabled():
+        return
+    origin = get_origin(url)
+    _open_until.pop(origin, None)
+    if cache.get_entry('breaker', origin):
+        cache.delete_entry('breaker', origin)
+        cache.delete_entry('breaker-trial', origin)
+        logger.info(f"Circuit breaker for {origin} closed")
+
+def record_failure(url):
+    """Count a failure from the origin of a URL, and open breaker if need be"""
+    if not is_enabled():
+        return
+    origin = get_origin(url)
+    state = cache.get_entry('breaker', origin) or {'failures': 0, 'opened_at': None}
+    state['failures'] += 1
+
+    is_trial_failure = state['opened_at'] is not None
+    if is_trial_failure or state['failures'] >= get_setting('BREAKER_THRESHOLD'):
+        state['opened_at'] = time.time()
+        _open_until[origin] = state['opened_at'] + get_setting('BREAKER_COOLDOWN')
+        logger.error(f"Circuit breaker for {origin} opened after {state['failures']} failures")
+
+    cache.set_entry('breaker', origin, state, get_state_timeout())
+    cache.delete_entry('breaker-trial', origin)
+
+def reset():
+    """Forget which breakers this process knows to be open (e.g. in tests)"""
+    _open_until.clear()
@@ -0,0 +1,206 @@
+import hashlib
+import logging
+import math
+import pickle
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+from django.core.cache import caches
+
+from . import metrics
+from .conf import get_setting
+
+logger = logging.getLogger(f"portal.{__name__}")
+
+KEY_PREFIX = 'djangocms_tacc_remote_content'
+
+# How hard zlib compresses (1 is fastest; markup compresses well regardless)
+ZLIB_LEVEL = 1
+
+# Functions to (de)compress entries, by name of compressor (if installed)
+COMPRESSORS = {
+    'zlib': (lambda payload: zlib.compress(payload, ZLIB_LEVEL), zlib.decompress),
+}
+if lz4 is not None:
+    COMPRESSORS['lz4'] = (lz4.frame.compress, lz4.frame.decompress)
+
+# Most identities to remember per index (see `add_to_index`)
+INDEX_SIZE = 10000
+# Most seconds to wait on (or hold) a lock
+LOCK_TIMEOUT = 5
+
+def get_cache():
+    """Get the Django cache that stores remote content"""
+    return caches[get_setting('CACHE_ALIAS')]
+
+def make_key(kind, value):
+    """
+    Build a cache key for a kind of entry (e.g. "source") and its identity.
+
+    The identity (e.g. a URL) is hashed to keep keys short and safe for
+    backends with key restrictions (e.g. memcached).
+    """
+    digest = hashlib.sha256(value.encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}:{kind}:{digest}"
+
+class Compressed:
+    """Data of an entry, pickled and then compressed"""
+    __slots__ = ('compressor', 'payload')
+
+    def __init__(self, compressor, payload):
+        self.compressor = compressor
+        self.payload = payload
+
+def get_compressor():
+    """
+    Get the first installed compressor of `PORTAL_PLUGIN_CONTENT_CACHE_COMPRESSOR`.
+
+    Returns:
+        The name of a compressor e.g. "lz4", else None (to not compress)
+    """
+    config = get_setting('CACHE_COMPRESSOR')
+    compressors = [config] if isinstance(config, str) else config or []
+    for compressor in compressors:
+        if compressor in COMPRESSORS:
+            return compressor
+        logger.debug(f"Compressor {compressor} is not installed")
+    return None
+
+def encode(data):
+    """
+    Prepare data to store in cache: as is, or compressed if it pickles to
+    at least `PORTAL_PLUGIN_CONTENT_CACHE_COMPRESS_MIN_SIZE` bytes.
+
+    Returns:
+        A tuple of (what to store, its size in bytes when pickled)
+    """
+    payload = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+    compressor = get_compressor()
+    if compressor is None or len(payload) < get_setting('CACHE_COMPRESS_MIN_SIZE'):
+        return data, len(payload)
+    compressed = COMPRESSORS[compressor][0](payload)
+    if len(compressed) >= len(payload):
+        return data, len(payload)
+    return Compressed(compressor, compressed), len(compressed)
+
+def decode(data):
+    """Get data that was stored in cache (see `encode`)"""
+    if not isinstance(data, Compressed):
+        return data
+    return pickle.loads(COMPRESSORS[data.compressor][1](data.payload))
+
+def is_storable(kind, value, size):
+    """Whether an entry of a size may be cached, per `PORTAL_PLUGIN_CONTENT_CACHE_MAX_ENTRY_SIZE`"""
+    max_size = get_setting('CACHE_MAX_ENTRY_SIZE')
+    is_stored = max_size is None or size <= max_size
+    metrics.record_cache_write(kind, size, is_stored)
+    if not is_stored:
+        logger.warning(f"Not caching {kind} entry of {size} bytes (more than {max_size}) for {value}")
+    return is_stored
+
+def get_entry(kind, value, default=None):
+    data = get_cache().get(make_key(kind, value), default)
+    try:
+        return decode(data)
+    except (KeyError, zlib.error, RuntimeError, pickle.UnpicklingError) as error:
+        # e.g. compressed by a compressor not installed in this process
+        logger.warning(f"Failed to read cached {kind} entry for {value}: {error!r}")
+        return default
+
+def set_entry(kind, value, data, timeout):
+    """
+    Store data (compressed, if large); return whether it was stored.
+
+    Data larger than `PORTAL_PLUGIN_CONTENT_CACHE_MAX_ENTRY_SIZE` is not
+    stored, and any older entry is deleted (so it is not mistaken as current).
+    """
+    stored, size = encode(data)
+    if not is_storable(kind, value, size):
+        delete_entry(kind, value)
+        return False
+    get_cache().set(make_key(kind, value), stored, timeout)
+    return True
+
+def add_entry(kind, value, data, timeout):
+    """Store data only if no entry exists; return whether it was stored"""
+    stored, size = encode(data)
+    if not is_storable(kind, value, size):
+        return False
+    return get_cache().add(make_key(kind, value), stored, timeout)
+
+def delete_entry(kind, value):
+    get_cache().delete(make_key(kind, value))
+
+def touch_entry(kind, value, timeout):
+    """Extend the lifetime of an entry; return whether it exists"""
+    return get_cache().touch(make_key(kind, value), timeout)
+
+@contextmanager
+def lock(kind, value, timeout=LOCK_TIMEOUT):
+    """
+    Hold a lock (across processes) on an entry while code within runs.
+
+    If the lock is not released within `timeout`, code runs anyway.
+    """
+    deadline = time.monotonic() + timeout
+    is_locked = add_entry('lock', f"{kind}|{value}", True, timeout)
+    while not is_locked and time.monotonic() < deadline:
+        time.sleep(0.01)
+        is_locked = add_entry('lock', f"{kind}|{value}", True, timeout)
+    try:
+        yield
+    finally:
+        if is_locked:
+            delete_entry('lock', f"{kind}|{value}")
+
+def get_index(kind):
+    """
+    Get identities (e.g. URLs) of entries of a kind, oldest first.
+
+    Returns:
+        A dict of identity to when (in seconds since the epoch) it may be
+        forgotten, i.e. after its entry expires
+    """
+    return get_entry('index', kind) or {}
+
+def set_index(kind, index):
+    """Store an index (without identities already expired) as long as its longest-lived identity"""
+    now = time.time()
+    index = {value: expires_at for value, expires_at in index.items() if expires_at > now}
+    if not index:
+        delete_entry('index', kind)
+        return
+    set_entry('index', kind, index, math.ceil(max(index.values()) - now))
+
+def add_to_index(kind, value, timeout):
+    """
+    Remember an entry was cached (for `timeout` seconds), so it can be
+    found without its identity (e.g. by path of its URL).
+
+    The index lives as long as its longest-lived entry, and remembers only
+    the newest `INDEX_SIZE` identities. Identities are remembered for twice
+    their timeout, so the index is not rewritten every time an entry is.
+    """
+    if get_index(kind).get(value, 0) >= time.time() + timeout:
+        return
+    with lock('index', kind):
+        index = get_index(kind)
+        index.pop(value, None)
+        index[value] = time.time() + 2 * timeout
+        for oldest in list(index)[:max(len(index) - INDEX_SIZE, 0)]:
+            del index[oldest]
+        set_index(kind, index)
+
+def remove_from_index(kind, values):
+    """Forget entries were cached (e.g. after deleting them)"""
+    with lock('index', kind):
+        index = get_index(kind)
+        for value in values:
+            index.pop(value, None)
+        set_index(kind, index)
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+import requests
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from asgiref.sync import sync_to_async
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .conf import get_setting
+
+logger = logging.getLogger(f"portal.{__name__}")
+
+# Bytes to read from a response at a time
+CHUNK_SIZE = 64 * 1024
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+# Async clients are bound to the event loop they were created in
+_async_clients = weakref.WeakKeyDictionary()
+
+class ContentLimitError(requests.RequestException):
+    """Remote content is larger than `PORTAL_PLUGIN_CONTENT_MAX_BYTES`"""
+
+class DeadlineError(requests.Timeout):
+    """Remote content took longer than `PORTAL_PLUGIN_CONTENT_DEADLINE` to load"""
+
+# Errors to expect from `get` and `aget`
+REQUEST_ERRORS = (requests.RequestException,)
+if httpx is not None:
+    REQUEST_ERRORS += (httpx.HTTPError,)
+
+def get_origin(url):
+    """Get the scheme and netloc of a URL (e.g. "https://tacc.utexas.edu")"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def get_timeout():
+    """Get the (connect, read) timeout for remote requests"""
+    return (get_setting('CONNECT_TIMEOUT'), get_setting('READ_TIMEOUT'))
+
+def get_max_duration():
+    """Get the most seconds a remote request may take, to connect and then to load"""
+    return get_setting('CONNECT_TIMEOUT') + get_setting('DEADLINE')
+
+def build_cookie_policy():
+    """
+    Build a policy that stores no cookies, so a shared session (or client)
+    does not send cookies of one fetch with later fetches (for any visitor)
+    """
+    return DefaultCookiePolicy(allowed_domains=[])
+
+def build_session():
+    """Build a session whose connection pool is sized from settings"""
+    pool_size = get_setting('POOL_SIZE')
+    session = requests.Session()
+    session.cookies.set_policy(build_cookie_policy())
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not get_setting('KEEP_ALIVE'):
+        session.headers['Connection'] = 'close'
+    return session
+
+def get_session(url):
+    """
+    Get the shared session for the origin of a URL.
+
+    One session (thus one pool of kept-alive connections) exists per origin
+    per process, so repeat fetches skip the TCP and TLS handshakes.
+    """
+    origin = get_origin(url)
+    session = _sessions.get(origin)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(origin)
+            if session is None:
+                session = build_session()
+                _sessions[origin] = session
+                logger.debug(f"Opened connection pool for {origin}")
+    return session
+
+def close_sessions():
+    """Close every shared session, and their pooled connections"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+def get_executor():
+    """Get the shared pool of threads to fetch many URLs at once"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_setting('FETCH_WORKERS'),
+                    thread_name_prefix='remote-content',
+                )
+    return _executor
+
+class BodyReader:
+    """
+    Collect chunks of a response body, within size and time limits.
+
+    Raises:
+        ContentLimitError: If body is larger than `PORTAL_PLUGIN_CONTENT_MAX_BYTES`
+        DeadlineError: If body takes longer than `PORTAL_PLUGIN_CONTENT_DEADLINE`
+            (since request started)
+    """
+    def __init__(self, url, headers, started_at):
+        self.url = url
+        self.max_bytes = get_setting('MAX_BYTES')
+        self.deadline = started_at + get_setting('DEADLINE')
+        self.chunks = []
+        self.size = 0
+
+        content_length = headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise ContentLimitError(f"Content of {url} is {content_length} bytes (limit: {self.max_bytes})")
+
+    def add(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise ContentLimitError(f"Content of {self.url} exceeds {self.max_bytes} bytes")
+        if time.monotonic() > self.deadline:
+            raise DeadlineError(f"Content of {self.url} took longer than {get_setting('DEADLINE')} seconds")
+        self.chunks.append(chunk)
+
+    def get_body(self):
+        return b''.join(self.chunks)
+
+def iter_chunks(response):
+    """
+    Iterate a streamed response body as its bytes arrive.
+
+    Unlike `iter_content`, which waits for a whole chunk, this yields as soon
+    as any bytes are read (if urllib3 supports it), so deadlines are checked
+    even while a slow origin drips its body.
+    """
+    raw = response.raw
+    if not (isinstance(raw, urllib3.response.HTTPResponse) and hasattr(raw, 'read1')):
+        yield from response.iter_content(chunk_size=CHUNK_SIZE)
+        return
+    while True:
+        chunk = raw.read1(CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            break
+        yield chunk
+
+def get(url, **kwargs):
+    """
+    Fetch a URL via the shared session for its origin.
+
+    The body is streamed, and the download stops early if the body is too
+    large or too slow (see `BodyReader`), so memory per fetch is bounded.
+    """
+    kwargs.setdefault('timeout', get_timeout())
+    started_at = time.monotonic()
+    response = get_session(url).get(url, stream=True, **kwargs)
+    try:
+        reader = BodyReader(url, response.headers, started_at)
+        for chunk in iter_chunks(response):
+            reader.add(chunk)
+    finally:
+        response.close()
+    # So `response.text` decodes (and detects encoding of) the bounded body
+    response._content = reader.get_body()
+    response._content_consumed = True
+    return response
+
+def build_async_client():
+    """Build an async client whose connection pool is sized from settings"""
+    pool_size = get_setting('POOL_SIZE')
+    connect_timeout, read_timeout = get_timeout()
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size if get_setting('KEEP_ALIVE') else 0,
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        # As `requests` does (e.g. from a path without a trailing slash)
+        follow_redirects=True,
+        cookies=CookieJar(policy=build_cookie_policy()),
+    )
+
+def get_async_client(url):
+    """Get the shared async client for the origin of a URL, in this event loop"""
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    origin = get_origin(url)
+    if origin not in clients:
+        clients[origin] = build_async_client()
+        logger.debug(f"Opened async connection pool for {origin}")
+    return clients[origin]
+
+async def aclose_async_clients():
+    """Close every async client of the running event loop"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for async_client in clients.values():
+        await async_client.aclose()
+
+async def aget(url, headers=None):
+    """
+    Fetch a URL without blocking the event loop.
+
+    Uses the shared async client for its origin, if `httpx` is installed,
+    else runs `get` in a thread.
+    """
+    if httpx is None:
+        return await sync_to_async(get, thread_sensitive=False)(url, headers=headers)
+
+    started_at = time.monotonic()
+    request = get_async_client(url).build_request('GET', url, headers=headers)
+    response = await get_async_client(url).send(request, stream=True)
+    try:
+        reader = BodyReader(url, response.headers, started_at)
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            reader.add(chunk)
+    finally:
+        await response.aclose()
+    # Body is already decoded, so it must not be decoded again
+    headers = response.headers.copy()
+    headers.pop('Content-Encoding', None)
+    headers.pop('Content-Length', None)
+    return httpx.Response(
+        response.status_code,
+        headers=headers,
+        content=reader.get_body(),
+        request=request,
+    )
+
+@receiver(setting_changed)
+def reset_sessions(setting, **kwargs):
+    """Rebuild sessions when a setting they depend on changes (e.g. in tests)"""
+    if setting in ('PORTAL_PLUGIN_CONTENT_POOL_SIZE', 'PORTAL_PLUGIN_CONTENT_KEEP_ALIVE'):
+        close_sessions()
@@ -1,19 +1,78 @@
+import asyncio
+import concurrent.futures
+import hashlib
 import logging
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlsplit, urlunparse, urljoin, ParseResult
+import re
+import threading
+import time
+from datetime import timedelta
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+from fnmatch import fnmatchcase
+from urllib.parse import urlsplit, urlunsplit, urlunparse, urlencode, ParseResult
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.defaultfilters import filesizeformat
+from django.urls import NoReverseMatch, re_path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from cms.cache import invalidate_cms_page_cache
 from cms.plugin_base import CMSPluginBase
 from cms.plugin_pool import plugin_pool
+from cms.utils.conf import get_cms_setting
 from django.utils.translation import gettext_lazy as _
 
 from .models import RemoteContent
 from .forms import RemoteContentForm, fieldsets
 from . import settings as defaults
+from . import breaker
+from . import cache
+from . import client
+from . import metrics
+from . import plans
+from . import policy
+from . import singleflight
+from .conf import get_setting
+from .stream import StreamingRewriter
+from .views import metrics_view
 
 logger = logging.getLogger(f"portal.{__name__}")
 
+DOCUMENT_PATTERN = re.compile(r'<html[\s>]', re.IGNORECASE)
+
+# CMS pages can load for editors with these query parameters
+CMS_PARAMS = {'edit', 'toolbar_on', 'toolbar_off', 'structure', 'preview'}
+
+# A selector that a `SoupStrainer` can match: a tag, ID, and classes
+SIMPLE_SELECTOR_PATTERN = re.compile(r'^([a-zA-Z][\w-]*)?(?:#([\w-]+))?((?:\.[\w-]+)*)$')
+
+# Seconds to remember how the last warm-up of a URL went
+WARMUP_TIMEOUT = 60 * 60 * 24
+
+# Header (set by middleware) by which to vary cached placeholders
+QUERY_HEADER = 'X-Remote-Content-Query'
+
+# Seconds to remember names of query parameters that instances forward
+PARAMS_TIMEOUT = 60 * 60
+
+# Fewest seconds between writes of an unchanged snapshot of an instance
+SNAPSHOT_MIN_INTERVAL = 60
+
+def parse_param_names(value):
+    """Parse names of query parameters, separated by commas or spaces (e.g. "page, tag")"""
+    return [name for name in re.split(r'[\s,]+', value) if name]
+
+@receiver([post_save, post_delete], sender=RemoteContent)
+def forget_forward_params(**kwargs):
+    """Forget names of query parameters that instances forward, when one changes"""
+    cache.delete_entry('params', 'overrides')
+
 @plugin_pool.register_plugin
 class RemoteContentPlugin(CMSPluginBase):
     """
@@ -25,28 +84,584 @@ class RemoteContentPlugin(CMSPluginBase):
     form = RemoteContentForm
     name = _('Remote Content')
     render_template = 'remote_content.html'
-    cache = True
     fieldsets = fieldsets
     readonly_fields = ['full_url']
 
+    # Attributes with URLs to transform: (
+    #     name of attribute,
+    #     name of method to transform its value,
+    #     attributes to add to tag if value is transformed
+    # )
+    url_attribute_rules = (
+        ('src', 'transform_url', {'crossorigin': 'anonymous'}),
+        ('srcset', 'transform_srcset', {}),
+        ('href', 'transform_url', {'crossorigin': 'anonymous', 'target': '_blank'}),
+    )
+
     def full_url(self, obj):
-        """Admin UI display of the full URL"""
-        return self.build_source_url(obj)
+        """Admin UI display of the full URL, and how its last warm-up went"""
+        url = self.build_source_url(obj)
+        warmup = cache.get_entry('warmup', url)
+        if warmup is None:
+            return url
+        if warmup['is_reachable']:
+            status = f"Reachable in {warmup['elapsed']:.2f}s ({filesizeformat(warmup['size'])})"
+        else:
+            status = f"Unreachable after {warmup['elapsed']:.2f}s"
+        warmed_at = timezone.localtime(warmup['warmed_at']).strftime('%Y-%m-%d %H:%M:%S')
+        return format_html('{}<br><small>{} as of {}</small>', url, status, warmed_at)
     full_url.short_description = _('Full URL')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if get_setting('WARM_ON_SAVE'):
+            url = self.build_source_url(obj)
+            content_selector = obj.content_selector
+            cache_timeout = self.get_instance_cache_timeout(obj)
+            transaction.on_commit(
+                lambda: client.get_executor().submit(self.warm_source_markup, url, content_selector, cache_timeout)
+            )
+
+    def warm_source_markup(self, url, content_selector='', cache_timeout=None):
+        """
+        Fetch (and transform) content of remote URL into cache, e.g. after an
+        editor saves a plugin, and note how it went (see `full_url`).
+
+        Content that is not to be cached (e.g. of an instance that never
+        caches) is only fetched, to note how it went.
+        """
+        start = time.monotonic()
+        is_cached = get_setting('CACHE_TIMEOUT') and cache_timeout != 0
+        if is_cached:
+            source_markup = self.refresh_source_markup(url, cache_timeout)
+        else:
+            source_markup = self.get_source_markup(url)
+        elapsed = time.monotonic() - start
+        if source_markup is not None and is_cached:
+            self.get_client_markup(source_markup, url, content_selector)
+        cache.set_entry('warmup', url, {
+            'is_reachable': source_markup is not None,
+            'elapsed': elapsed,
+            'size': len(source_markup.encode('utf-8')) if source_markup is not None else 0,
+            'warmed_at': timezone.now(),
+        }, WARMUP_TIMEOUT)
+        logger.info(f"Warmed content from {url} in {elapsed:.3f}s")
+        return source_markup
+
+    def get_plugin_urls(self):
+        """Add admin page of metrics (e.g. /admin/cms/page/plugin/remotecontentplugin/metrics/)"""
+        return [
+            re_path(r'^metrics/$', staff_member_required(metrics_view), name='remote_content_metrics'),
+        ]
+
     def get_source_root(self):
         """Get the source root URL from settings or default"""
         return getattr(settings, 'PORTAL_PLUGIN_CONTENT_NETLOC', defaults.NETLOC)
 
+    def get_source_response(self, url, headers=None):
+        """
+        Request remote URL, or return None if the request fails.
+
+        If the origin of the URL failed too often, the request is not sent
+        (until a cooldown) i.e. the circuit breaker is open.
+        """
+        if not breaker.allow_request(url):
+            logger.debug(f"Not fetching content from {url}; circuit breaker is open")
+            return None
+        try:
+            start = time.monotonic()
+            if headers:
+                response = client.get(url, headers=headers)
+            else:
+                response = client.get(url)
+            self.record_fetch_timings(url, response, time.monotonic() - start)
+        except client.ContentLimitError as error:
+            logger.error(f"Failed to fetch content from {url}: {error}")
+            return None
+        except client.REQUEST_ERRORS as error:
+            logger.error(f"Failed to fetch content from {url}: {error}")
+            breaker.record_failure(url)
+            return None
+        self.record_source_response(url, response)
+        return response
+
+    async def aget_source_response(self, url, headers=None):
+        """Request remote URL without blocking (e.g. for ASGI)"""
+        if not await sync_to_async(breaker.allow_request, thread_sensitive=False)(url):
+            logger.debug(f"Not fetching content from {url}; circuit breaker is open")
+            return None
+        try:
+            response = await client.aget(url, headers=headers or None)
+        except client.ContentLimitError as error:
+            logger.error(f"Failed to fetch content from {url}: {error}")
+            return None
+        except client.REQUEST_ERRORS as error:
+            logger.error(f"Failed to fetch content from {url}: {error}")
+            await sync_to_async(breaker.record_failure, thread_sensitive=False)(url)
+            return None
+        await sync_to_async(self.record_source_response, thread_sensitive=False)(url, response)
+        return response
+
+    def record_fetch_timings(self, url, response, duration):
+        """Record how long a fetch waited on its response, then transferred it"""
+        elapsed = getattr(response, 'elapsed', None)
+        if not isinstance(elapsed, timedelta):
+            return
+        wait = min(elapsed.total_seconds(), duration)
+        metrics.record_phase(type(self), 'fetch_wait', wait, url)
+        metrics.record_phase(type(self), 'fetch_transfer', duration - wait, url)
+
+    def record_source_response(self, url, response):
+        """Count a server error as a failure of the origin, else a success"""
+        if response.status_code >= 500:
+            breaker.record_failure(url)
+        else:
+            breaker.record_success(url)
+
     def get_source_markup(self, url):
         """Fetch content from remote URL"""
-        response = requests.get(url)
+        response = self.get_source_response(url)
+        if response is None:
+            return None
         if response.status_code == 200:
             return response.text
         else:
             logger.error(f"Failed to fetch content from {url}")
             return None
 
+    def fetch_source_markup(self, url, cache_timeout=None):
+        """
+        Get content of remote URL from cache, else fetch it.
+
+        Content is fresh for as long as its response says (see
+        `get_source_cache_policy`), else for `PORTAL_PLUGIN_CONTENT_CACHE_TIMEOUT`.
+        After that, it is still returned for `stale-while-revalidate` (else
+        `PORTAL_PLUGIN_CONTENT_CACHE_STALE_TIMEOUT`) seconds, while one
+        background thread fetches it again. After that, it is fetched again
+        before it is returned, unless that fails within `stale-if-error` seconds.
+
+        Content not cached is fetched only once at a time, while concurrent
+        callers (in any process) wait on that fetch.
+
+        Args:
+            cache_timeout: Seconds content is fresh for, instead of what its
+                response says (0 to not cache it), e.g. of a plugin instance
+        """
+        if not get_setting('CACHE_TIMEOUT') or cache_timeout == 0:
+            return self.get_source_markup(url)
+
+        entry = cache.get_entry('source', url)
+        if entry is None or entry.get('no_store'):
+            metrics.record_cache(type(self), 'source', 'miss', url)
+            return singleflight.run(
+                f"source|{url}",
+                lambda: self.refresh_source_markup(url, cache_timeout),
+                lambda: (cache.get_entry('source', url) or {}).get('markup'),
+            )
+
+        staleness = self.get_source_staleness(entry, cache_timeout)
+        if staleness < 0:
+            metrics.record_cache(type(self), 'source', 'hit', url)
+        elif staleness < self.get_stale_timeouts(entry)[0]:
+            metrics.record_cache(type(self), 'source', 'stale', url)
+            self.refresh_in_background(url, cache_timeout)
+        else:
+            metrics.record_cache(type(self), 'source', 'expired', url)
+            markup = singleflight.run(
+                f"source|{url}",
+                lambda: self.refresh_source_markup(url, cache_timeout),
+                lambda: self.get_refreshed_source_markup(url, entry),
+            )
+            return self.get_source_markup_on_error(url, entry, staleness) if markup is None else markup
+
+        return entry['markup']
+
+    async def afetch_source_markup(self, url, cache_timeout=None):
+        """Get content of remote URL like `fetch_source_markup`, but async"""
+        if not get_setting('CACHE_TIMEOUT') or cache_timeout == 0:
+            response = await self.aget_source_response(url)
+            if response is not None and response.status_code == 200:
+                return response.text
+            logger.error(f"Failed to fetch content from {url}")
+            return None
+
+        entry = await sync_to_async(cache.get_entry, thread_sensitive=False)('source', url)
+        if entry is None or entry.get('no_store'):
+            metrics.record_cache(type(self), 'source', 'miss', url)
+            return await singleflight.arun(
+                f"source|{url}",
+                lambda: self.arefresh_source_markup(url, cache_timeout),
+                lambda: (cache.get_entry('source', url) or {}).get('markup'),
+            )
+
+        staleness = self.get_source_staleness(entry, cache_timeout)
+        if staleness < 0:
+            metrics.record_cache(type(self), 'source', 'hit', url)
+        elif staleness < self.get_stale_timeouts(entry)[0]:
+            metrics.record_cache(type(self), 'source', 'stale', url)
+            await sync_to_async(self.refresh_in_background, thread_sensitive=False)(url, cache_timeout)
+        else:
+            metrics.record_cache(type(self), 'source', 'expired', url)
+            markup = await singleflight.arun(
+                f"source|{url}",
+                lambda: self.arefresh_source_markup(url, cache_timeout),
+                lambda: self.get_refreshed_source_markup(url, entry),
+            )
+            return self.get_source_markup_on_error(url, entry, staleness) if markup is None else markup
+
+        return entry['markup']
+
+    async def arefresh_source_markup(self, url, cache_timeout=None):
+        """Fetch content from remote URL and cache it, like `refresh_source_markup`, but async"""
+        entry = await sync_to_async(cache.get_entry, thread_sensitive=False)('source', url)
+        headers = self.get_conditional_headers(entry)
+        response = await self.aget_source_response(url, headers)
+        return await sync_to_async(self.store_source_response, thread_sensitive=False)(url, response, entry, headers, cache_timeout)
+
+    def refresh_source_markup(self, url, cache_timeout=None):
+        """
+        Fetch content from remote URL and cache it.
+
+        If content is already cached, the request is conditional (via its
+        `ETag` and `Last-Modified`), so a `304` response only extends the
+        lifetime of the cached content and of its transformed markup.
+        """
+        entry = cache.get_entry('source', url)
+        headers = self.get_conditional_headers(entry)
+        response = self.get_source_response(url, headers)
+        return self.store_source_response(url, response, entry, headers, cache_timeout)
+
+    def get_source_staleness(self, entry, cache_timeout=None):
+        """Get seconds since cached content stopped being fresh (negative if it is fresh)"""
+        if cache_timeout is None:
+            expires_at = entry['expires_at']
+        else:
+            expires_at = entry['fetched_at'] + cache_timeout
+        return time.time() - expires_at
+
+    def get_stale_timeouts(self, entry):
+        """Get seconds that stale content is served while it is fetched, and if fetching it fails"""
+        if 'stale_while_revalidate' not in entry:
+            # Cached without a policy (e.g. by an earlier version), so served while cached
+            return float('inf'), 0
+        stale_while_revalidate = entry['stale_while_revalidate']
+        if stale_while_revalidate is None:
+            stale_while_revalidate = get_setting('CACHE_STALE_TIMEOUT')
+        return stale_while_revalidate, entry.get('stale_if_error') or 0
+
+    def get_refreshed_source_markup(self, url, entry):
+        """Get content cached since entry was, e.g. by another process"""
+        refreshed = cache.get_entry('source', url) or {}
+        if refreshed.get('fetched_at') == entry['fetched_at']:
+            return None
+        return refreshed.get('markup')
+
+    def get_source_markup_on_error(self, url, entry, staleness):
+        """Get stale content that failed to fetch again, if its response allows serving it"""
+        if staleness < self.get_stale_timeouts(entry)[1]:
+            logger.warning(f"Serving stale content from {url}, because fetching it again failed")
+            return entry['markup']
+        return None
+
+    def get_conditional_headers(self, entry):
+        """Get headers to request content only if it changed since cached"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store_source_response(self, url, response, entry=None, headers=None, cache_timeout=None):
+        """
+        Cache content of response (or extend cached content if not modified),
+        unless the response says not to.
+
+        Content that must not be cached is still returned, and only a note
+        that it must not be cached is cached (so neither is its transformed
+        markup, nor are placeholders that render it).
+        """
+        if response is None:
+            return None
+
+        cache_policy = self.get_source_cache_policy(response)
+        if response.status_code == 304 and headers:
+            logger.debug(f"Content from {url} is not modified")
+            for content_selector in self.get_content_selectors(url):
+                identity = self.get_client_markup_identity(entry['markup'], url, content_selector)
+                cache.touch_entry('client', identity, self.get_cache_timeout())
+            cache.touch_entry('selectors', url, self.get_cache_timeout())
+            # A response without a policy keeps the policy of cached content
+            if cache_policy['max_age'] is not None or cache_policy['no_store']:
+                entry.update(cache_policy)
+        elif response.status_code == 200:
+            entry = {
+                'markup': response.text,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                **cache_policy,
+            }
+        else:
+            logger.error(f"Failed to fetch content from {url}")
+            return None
+
+        markup = entry['markup']
+        if entry.get('no_store'):
+            logger.debug(f"Content from {url} must not be cached")
+            entry = dict(cache_policy)
+        self.set_source_entry(url, entry, cache_timeout)
+        return markup
+
+    def get_source_cache_policy(self, response):
+        """
+        Get how long content of response may be cached, per its `Cache-Control`
+        and `Expires` headers (see `policy.get_policy`), unless
+        `PORTAL_PLUGIN_CONTENT_CACHE_HEADERS` is `False`.
+        """
+        if not get_setting('CACHE_HEADERS'):
+            return policy.get_policy({})
+        return policy.get_policy(response.headers)
+
+    def set_source_entry(self, url, entry, cache_timeout=None):
+        """
+        Cache fetched content (and its metadata) as fresh.
+
+        Content is kept (to serve while stale, and to fetch conditionally) at
+        least as long as by default, and as long as its response and
+        `cache_timeout` (e.g. of the instance that fetched it) allow.
+        """
+        max_age = entry.get('max_age')
+        if max_age is None:
+            max_age = get_setting('CACHE_TIMEOUT')
+        fetched_at = time.time()
+        entry['fetched_at'] = fetched_at
+        entry['expires_at'] = fetched_at + max_age
+
+        stale_timeout = max(self.get_stale_timeouts(entry))
+        timeout = max(self.get_cache_timeout(), max_age + stale_timeout, (cache_timeout or 0) + stale_timeout)
+        if cache.set_entry('source', url, entry, timeout):
+            cache.add_to_index('source', url, timeout)
+
+    def get_document_url(self, url):
+        """Get a URL without its query or fragment (i.e. what invalidation matches)"""
+        parts = urlsplit(url)
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+
+    def invalidate_source_markup(self, paths=(), prefixes=()):
+        """
+        Forget cached content (fetched and transformed) of remote paths (with
+        any query), and of paths that start with prefixes, and forget cached
+        placeholders of plugins that render that content.
+
+        Args:
+            paths: Remote paths (e.g. "/news/latest-news/"), like `remote_path`
+            prefixes: Starts of remote paths (e.g. "/news/")
+
+        Returns:
+            A list of URLs whose cached content was forgotten
+        """
+        document_urls = {self.get_document_url(self.build_source_url(RemoteContent(remote_path=path))) for path in paths}
+        prefix_urls = [self.get_document_url(self.build_source_url(RemoteContent(remote_path=prefix))) for prefix in prefixes]
+
+        def is_match(url):
+            document_url = self.get_document_url(url)
+            return document_url in document_urls or any(document_url.startswith(prefix_url) for prefix_url in prefix_urls)
+
+        urls = [url for url in cache.get_index('source') if is_match(url)]
+        instances = [
+            instance for instance in RemoteContent.objects.select_related('placeholder')
+            if is_match(self.build_source_url(instance))
+        ]
+
+        # Transformed markup is identified by content, so find it via content
+        content_selectors = {instance.content_selector for instance in instances}
+        for url in urls:
+            entry = cache.get_entry('source', url)
+            if entry is not None and entry.get('markup') is not None:
+                for content_selector in content_selectors | self.get_content_selectors(url):
+                    identity = self.get_client_markup_identity(entry['markup'], url, content_selector)
+                    cache.delete_entry('client', identity)
+            cache.delete_entry('source', url)
+            cache.delete_entry('selectors', url)
+        if urls:
+            cache.remove_from_index('source', urls)
+
+        for instance in instances:
+            instance.placeholder.clear_cache(instance.language)
+        # Django CMS cannot forget cached pages per page, only all at once
+        if instances and get_cms_setting('PAGE_CACHE'):
+            invalidate_cms_page_cache()
+
+        logger.info(f"Invalidated content of {len(urls)} URLs and {len(instances)} plugins")
+        return urls
+
+    def get_cache_timeout(self):
+        """Get how long cached content may be served, even if stale"""
+        return get_setting('CACHE_TIMEOUT') + get_setting('CACHE_STALE_TIMEOUT')
+
+    def refresh_in_background(self, url, cache_timeout=None):
+        """
+        Fetch content from remote URL in a thread, unless one already is.
+
+        Returns the thread, or None if another refresh holds the lock.
+        """
+        # Held as long as the fetch may take, so no other starts meanwhile
+        lock_timeout = client.get_max_duration()
+        if not cache.add_entry('refresh', url, True, lock_timeout):
+            return None
+
+        def refresh():
+            try:
+                self.refresh_source_markup(url, cache_timeout)
+            finally:
+                cache.delete_entry('refresh', url)
+
+        thread = threading.Thread(target=refresh, daemon=True)
+        thread.start()
+        return thread
+
+    def prefetch_source_markup(self, instances, request=None):
+        """
+        Start to fetch content for many plugin instances at once.
+
+        Each distinct URL is fetched by the shared pool of threads, and its
+        future is stored on the request, for `render` to wait on. Instances
+        that never cache content are not prefetched (they fetch on render).
+        """
+        prefetched = getattr(request, 'remote_content_prefetch', {})
+        executor = client.get_executor()
+        for instance in instances:
+            cache_timeout = self.get_instance_cache_timeout(instance)
+            if cache_timeout == 0:
+                continue
+            url = self.build_source_url(instance, request)
+            if url not in prefetched:
+                prefetched[url] = executor.submit(self.fetch_source_markup, url, cache_timeout)
+        if request is not None:
+            request.remote_content_prefetch = prefetched
+        return prefetched
+
+    async def aprefetch_source_markup(self, instances, request=None):
+        """
+        Start to fetch content for many plugin instances at once, like
+        `prefetch_source_markup`, but as tasks of the running event loop.
+
+        Futures are thread-safe, so `render` (which Django runs in a thread)
+        can wait on them.
+        """
+        loop = asyncio.get_running_loop()
+        prefetched = getattr(request, 'remote_content_prefetch', {})
+        for instance in instances:
+            cache_timeout = self.get_instance_cache_timeout(instance)
+            if cache_timeout == 0:
+                continue
+            url = self.build_source_url(instance, request)
+            if url not in prefetched:
+                coroutine = self.afetch_source_markup(url, cache_timeout)
+                prefetched[url] = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        if request is not None:
+            request.remote_content_prefetch = prefetched
+        return prefetched
+
+    def get_prefetched_source_markup(self, url, request=None, cache_timeout=None):
+        """
+        Get content that was prefetched for request, else fetch it now.
+
+        A prefetch not done within `PORTAL_PLUGIN_CONTENT_DEADLINE` is not
+        waited on further (e.g. if its task cannot run), and content is
+        fetched now instead.
+        """
+        future = getattr(request, 'remote_content_prefetch', {}).get(url)
+        if future is None or cache_timeout == 0:
+            return self.fetch_source_markup(url, cache_timeout)
+        try:
+            return future.result(timeout=get_setting('DEADLINE'))
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"Prefetch of content from {url} is not done; fetching it now")
+            return self.fetch_source_markup(url, cache_timeout)
+
+    def get_instance_cache_timeout(self, instance):
+        """Get seconds that content of instance is fresh for (0 to not cache), or None if the response decides"""
+        if instance.never_cache:
+            return 0
+        return instance.cache_timeout
+
+    def get_content_lifetime(self, request, instance):
+        """
+        Get seconds that content rendered for instance (and request) is still
+        fresh for, i.e. how long what renders it may be cached.
+
+        Content that is stale, not cached, or must not be cached, has none.
+        """
+        cache_timeout = self.get_instance_cache_timeout(instance)
+        if not get_setting('CACHE_TIMEOUT') or cache_timeout == 0:
+            return 0
+        entry = cache.get_entry('source', self.build_source_url(instance, request))
+        if entry is None or entry.get('no_store'):
+            return 0
+        return max(0, -self.get_source_staleness(entry, cache_timeout))
+
+    def get_cache_expiration(self, request, instance, placeholder):
+        """Cache placeholders (and pages) with inline content only while it is fresh"""
+        if self.is_deferred(instance):
+            return None
+        return timedelta(seconds=self.get_content_lifetime(request, instance))
+
+    def get_forward_params_allowlist(self, instance):
+        """
+        Get names of request query parameters to forward to remote URL, per
+        instance, else per setting, or None to forward any
+        """
+        if instance.forward_params:
+            return parse_param_names(instance.forward_params)
+        return get_setting('FORWARD_PARAMS')
+
+    def get_any_forward_params_allowlist(self):
+        """
+        Get names of request query parameters that any instance might forward
+        (per setting, and per instances that override it), or None if any.
+
+        Names that instances override with are cached, until an instance changes.
+        """
+        allowlist = get_setting('FORWARD_PARAMS')
+        if allowlist is None:
+            return None
+        override_names = cache.get_entry('params', 'overrides')
+        if override_names is None:
+            overrides = RemoteContent.objects.exclude(forward_params='').values_list('forward_params', flat=True)
+            override_names = sorted({name for value in overrides.distinct() for name in parse_param_names(value)})
+            cache.set_entry('params', 'overrides', override_names, PARAMS_TIMEOUT)
+        return [*allowlist, *override_names]
+
+    def get_forward_params(self, request, allowlist=None):
+        """
+        Get request query parameters to forward to remote URL, in a canonical
+        order, excluding parameters of CMS and `PORTAL_PLUGIN_CONTENT_IGNORE_PARAMS`.
+
+        Returns:
+            A sorted list of name-value pairs
+        """
+        ignore_params = get_setting('IGNORE_PARAMS')
+        params = []
+        for key, values in request.GET.lists():
+            if key in CMS_PARAMS:
+                continue
+            if allowlist is not None and key not in allowlist:
+                continue
+            if any(fnmatchcase(key, pattern) for pattern in ignore_params):
+                continue
+            params.extend((key, value.strip()) for value in values)
+        return sorted(params)
+
+    def get_vary_cache_on(self, request, instance, placeholder):
+        """
+        Vary cached placeholders by forwarded query parameters.
+
+        CMS caches placeholders by headers, so the query parameters that
+        might be forwarded are set as a header by `RemoteContentQueryMiddleware`.
+        """
+        return [QUERY_HEADER]
+
     def build_source_url(self, instance, request=None):
         """Build the source URL from settings and instance path"""
         source_root = self.get_source_root()
@@ -55,17 +670,11 @@ class RemoteContentPlugin(CMSPluginBase):
         root_parts = urlsplit(source_root)
         page_parts = urlsplit(page)
 
-        # CMS pages can load for editors with these query parameters
-        cms_params = {'edit', 'toolbar_on', 'toolbar_off', 'structure', 'preview'}
-
         query_params = page_parts.query
         if request and request.GET:
-            filtered_params = {
-                key: value for key, value in request.GET.items()
-                if key not in cms_params
-            }
-            if filtered_params:
-                request_query = '&'.join(f"{key}={value}" for key, value in filtered_params.items())
+            allowlist = self.get_forward_params_allowlist(instance)
+            request_query = urlencode(self.get_forward_params(request, allowlist))
+            if request_query:
                 query_params = f"{query_params}&{request_query}" if query_params else request_query
 
         url_parts = ParseResult(
@@ -81,17 +690,22 @@ class RemoteContentPlugin(CMSPluginBase):
         logger.debug(f"Attempting to fetch: {source_url}")
         return source_url
 
-    def should_keep_relative(self, element, config):
-        """Determine if element should keep relative URLs based on setting"""
+    def should_keep_relative(self, element, config, relative_elements=None):
+        """
+        Determine if element should keep relative URLs based on setting.
+
+        To not evaluate selectors per element, pass `relative_elements` (see
+        `TransformPlan.select_relative_elements`) of the whole document.
+        """
+        if relative_elements is not None:
+            return id(element) in relative_elements
         if isinstance(config, bool):
             return config
         if isinstance(config, (list, tuple)):
             root = element
             while root.parent:
                 root = root.parent
-            for selector in config:
-                if element in root.select(selector):
-                    return True
+            return id(element) in self.get_transform_plan(config).select_relative_elements(root)
         return False
 
     def is_relative_path(self, url):
@@ -154,7 +768,7 @@ class RemoteContentPlugin(CMSPluginBase):
                 descriptor = ''
 
             if self.is_relative_path(url):
-                url = urljoin(source_url, url)
+                url = plans.resolve_url(source_url, url)
 
             parts.append(url + descriptor)
 
@@ -162,54 +776,413 @@ class RemoteContentPlugin(CMSPluginBase):
             return ', '.join(parts)
         return None
 
-    def build_client_markup(self, source_markup, source_url):
-        """Transform remote content for local display"""
+    def transform_url(self, url, source_url):
+        """Transform a relative URL to an absolute URL, else return None"""
+        if self.is_relative_path(url):
+            return plans.resolve_url(source_url, url)
+        return None
+
+    def transform_tag(self, tag, source_url, use_relative, relative_elements=None):
+        """
+        Transform relative URLs in attributes of a tag, per `url_attribute_rules`.
+
+        Returns:
+            True if any attribute was transformed, False otherwise
+        """
+        is_transformed = False
+        keep_relative = None
+        for attribute, transform_name, extra_attributes in self.url_attribute_rules:
+            value = tag.get(attribute)
+            if value is None:
+                continue
+            transformed_value = getattr(self, transform_name)(value, source_url)
+            if not transformed_value:
+                continue
+            if keep_relative is None:
+                keep_relative = self.should_keep_relative(tag, use_relative, relative_elements)
+            if keep_relative:
+                return False
+            tag[attribute] = transformed_value
+            for extra_attribute, extra_value in extra_attributes.items():
+                tag[extra_attribute] = extra_value
+            is_transformed = True
+        return is_transformed
+
+    def get_parser(self):
+        """
+        Get the first installed parser of `PORTAL_PLUGIN_CONTENT_PARSER`.
+
+        Returns:
+            The name of a parser e.g. "lxml", else "html.parser" (built-in)
+        """
+        config = get_setting('PARSER')
+        parsers = [config] if isinstance(config, str) else config
+        for parser in parsers:
+            if builder_registry.lookup(parser):
+                return parser
+            logger.debug(f"Parser {parser} is not installed")
+        return 'html.parser'
+
+    def serialize_markup(self, soup, source_markup):
+        """
+        Serialize parsed content, without any document that parser added.
+
+        Parsers like lxml and html5lib wrap fragments in `<html>`, `<head>`,
+        and `<body>`, which must not be added to the client page.
+        """
+        if soup.html is None or DOCUMENT_PATTERN.search(source_markup):
+            return str(soup)
+        contents = []
+        for section in (soup.head, soup.body):
+            if section is not None:
+                contents.extend(section.contents)
+        return ''.join(str(element) for element in contents)
+
+    def transform_attributes(self, attrs, source_url):
+        """
+        Transform relative URLs in attributes, per `url_attribute_rules`.
+
+        Args:
+            attrs: Attributes of a tag, as a list of name-value pairs
+
+        Returns:
+            New list of attributes, or None if no attribute was transformed
+        """
+        values = dict(attrs)
+        transformed_values = {}
+        for attribute, transform_name, extra_attributes in self.url_attribute_rules:
+            value = values.get(attribute)
+            if value is None:
+                continue
+            transformed_value = getattr(self, transform_name)(value, source_url)
+            if not transformed_value:
+                continue
+            transformed_values[attribute] = transformed_value
+            transformed_values.update(extra_attributes)
+
+        if not transformed_values:
+            return None
+
+        transformed_attrs = [(name, transformed_values.get(name, value)) for name, value in attrs]
+        transformed_attrs.extend(
+            (name, value) for name, value in transformed_values.items()
+            if name not in values
+        )
+        return transformed_attrs
+
+    def stream_client_markup(self, source_markup, source_url):
+        """
+        Transform remote content for local display, without parsing a tree.
+
+        For `PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS` of `False` only,
+        because which URLs to transform then depends on no CSS selector.
+        """
+        chunks = []
+        rewriter = StreamingRewriter(
+            lambda tag, attrs: self.transform_attributes(attrs, source_url),
+            chunks.append
+        )
+        with metrics.time_phase(type(self), 'rewrite', source_url):
+            rewriter.feed(source_markup)
+            rewriter.close()
+            return ''.join(chunks)
+
+    def get_content_strainer(self, content_selector):
+        """
+        Get a `SoupStrainer` that parses (at least) what a selector matches.
+
+        Only simple selectors (e.g. "article", "#main", "div.news") can be
+        strained. A strainer may match more than the selector does (e.g.
+        "div.a.b" is strained as "div.a"), because matches are selected after.
+
+        Returns:
+            A `SoupStrainer`, or None if content must be parsed entirely
+        """
+        match = SIMPLE_SELECTOR_PATTERN.match(content_selector.strip())
+        if not match or not any(match.groups()) or self.get_parser() == 'html5lib':
+            return None
+        name, element_id, classes = match.groups()
+        attrs = {}
+        if element_id:
+            attrs['id'] = element_id
+        if classes:
+            # While parsing, class is one string (e.g. "story lead")
+            class_name = classes.split('.')[1]
+            attrs['class'] = lambda value: bool(value) and class_name in value.split()
+        return SoupStrainer(name, attrs)
+
+    def select_content(self, source_markup, content_selector):
+        """
+        Parse only the part of remote content that a selector matches.
+
+        Returns:
+            A list of matched elements (excluding those within another match),
+            or None if nothing matched (or selector is invalid)
+        """
+        strainer = self.get_content_strainer(content_selector)
+        soup = BeautifulSoup(source_markup, self.get_parser(), parse_only=strainer)
+        try:
+            selected_elements = soup.select(content_selector)
+        except soupsieve.SelectorSyntaxError as error:
+            logger.error(f"Content selector {content_selector!r} is invalid: {error}")
+            return None
+        matched_elements = set()
+        elements = []
+        for element in selected_elements:
+            matched_elements.add(id(element))
+            if not any(id(parent) in matched_elements for parent in element.parents):
+                elements.append(element)
+        if not elements:
+            logger.warning(f"Content selector {content_selector!r} matched nothing")
+            return None
+        return elements
+
+    def get_transform_plan(self, use_relative=None):
+        """
+        Get the plan to transform content, per
+        `PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS` (or a value of it)
+        """
+        if use_relative is None:
+            use_relative = get_setting('USE_RELATIVE_PATHS')
+        if isinstance(use_relative, list):
+            use_relative = tuple(use_relative)
+        return plans.get_plan(use_relative)
+
+    def build_client_markup(self, source_markup, source_url, content_selector=''):
+        """
+        Transform remote content for local display.
+
+        With a `content_selector`, only the matched part is transformed and
+        returned. If only that part is parsed (see `get_content_strainer`),
+        `PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS` selectors match only within it.
+        """
         if not source_markup:
             return None
 
-        soup = BeautifulSoup(source_markup, 'html.parser')
+        plan = self.get_transform_plan()
+        use_relative = plan.use_relative
 
-        use_relative = getattr(settings, 'PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS', defaults.USE_RELATIVE_PATHS)
+        if content_selector:
+            with metrics.time_phase(type(self), 'parse', source_url):
+                elements = self.select_content(source_markup, content_selector)
+            if elements is None:
+                return None
+            if use_relative is not True:
+                with metrics.time_phase(type(self), 'rewrite', source_url):
+                    soup = list(elements[0].parents)[-1]
+                    relative_elements = plan.select_relative_elements(soup)
+                    for element in elements:
+                        for tag in [element, *element.find_all(True)]:
+                            self.transform_tag(tag, source_url, use_relative, relative_elements)
+            with metrics.time_phase(type(self), 'serialize', source_url):
+                return ''.join(str(element) for element in elements)
 
-        for tag in soup.find_all(src=True):
-            src = tag['src']
-            if self.is_relative_path(src):
-                if not self.should_keep_relative(tag, use_relative):
-                    tag['crossorigin'] = 'anonymous'
-                    tag['src'] = urljoin(source_url, src)
+        if use_relative is True:
+            return source_markup
+        if use_relative is False:
+            return self.stream_client_markup(source_markup, source_url)
 
-        for tag in soup.find_all(srcset=True):
-            if not self.should_keep_relative(tag, use_relative):
-                transformed_srcset = self.transform_srcset(tag['srcset'], source_url)
-                if transformed_srcset:
-                    tag['srcset'] = transformed_srcset
+        with metrics.time_phase(type(self), 'parse', source_url):
+            soup = BeautifulSoup(source_markup, self.get_parser())
 
-        for tag in soup.find_all(href=True):
-            href = tag['href']
-            if not self.is_relative_path(href):
-                continue
-            if not self.should_keep_relative(tag, use_relative):
-                tag['crossorigin'] = 'anonymous'
-                tag['href'] = urljoin(source_url, href)
-                tag['target'] = '_blank'
+        with metrics.time_phase(type(self), 'rewrite', source_url):
+            relative_elements = plan.select_relative_elements(soup)
+            for tag in soup.find_all(True):
+                self.transform_tag(tag, source_url, use_relative, relative_elements)
+
+        with metrics.time_phase(type(self), 'serialize', source_url):
+            return self.serialize_markup(soup, source_markup)
+
+    def get_client_markup_identity(self, source_markup, source_url, content_selector=''):
+        """Identify transformed markup by everything its transformation uses"""
+        digest = hashlib.sha256(source_markup.encode('utf-8')).hexdigest()
+        use_relative = get_setting('USE_RELATIVE_PATHS')
+        return f"{digest}|{source_url}|{content_selector}|{use_relative!r}|{self.get_parser()}"
+
+    def get_client_markup(self, source_markup, source_url, content_selector='', cache_timeout=None):
+        """
+        Transform remote content, or reuse markup already transformed from
+        identical content, at the same URL, with the same settings.
+
+        Content not yet transformed is transformed only once at a time, while
+        concurrent callers (in any process) wait on that transformation.
+        """
+        if not source_markup or not get_setting('CACHE_TIMEOUT') or cache_timeout == 0:
+            return self.build_client_markup(source_markup, source_url, content_selector)
+
+        client_markup = self.get_cached_client_markup(source_markup, source_url, content_selector)
+        metrics.record_cache(type(self), 'client', 'miss' if client_markup is None else 'hit', source_url)
+        if client_markup is None:
+            identity = self.get_client_markup_identity(source_markup, source_url, content_selector)
+            client_markup = singleflight.run(
+                f"client|{identity}",
+                lambda: self.build_cached_client_markup(source_markup, source_url, content_selector),
+                lambda: self.get_cached_client_markup(source_markup, source_url, content_selector),
+            )
+        return client_markup
 
-        return str(soup)
+    def build_cached_client_markup(self, source_markup, source_url, content_selector=''):
+        """Transform remote content, and cache the result"""
+        client_markup = self.build_client_markup(source_markup, source_url, content_selector)
+        self.set_cached_client_markup(source_markup, source_url, client_markup, content_selector)
+        return client_markup
+
+    def get_cached_client_markup(self, source_markup, source_url, content_selector=''):
+        """Get markup already transformed from remote content, if cached"""
+        identity = self.get_client_markup_identity(source_markup, source_url, content_selector)
+        return cache.get_entry('client', identity)
+
+    def set_cached_client_markup(self, source_markup, source_url, client_markup, content_selector=''):
+        """Cache markup transformed from remote content, unless the content must not be cached"""
+        if client_markup is not None and not (cache.get_entry('source', source_url) or {}).get('no_store'):
+            identity = self.get_client_markup_identity(source_markup, source_url, content_selector)
+            cache.set_entry('client', identity, client_markup, self.get_cache_timeout())
+            self.add_content_selector(source_url, content_selector)
+
+    def get_content_selectors(self, source_url):
+        """Get selectors that content of a URL was transformed with (and cached), including none"""
+        return {'', *(cache.get_entry('selectors', source_url) or ())}
+
+    def add_content_selector(self, source_url, content_selector):
+        """
+        Remember that content of a URL was transformed with a selector, so
+        its transformed markup can be found without the plugin instance (e.g.
+        to extend it when content is not modified).
+        """
+        if content_selector in self.get_content_selectors(source_url):
+            return
+        with cache.lock('selectors', source_url):
+            content_selectors = self.get_content_selectors(source_url) | {content_selector}
+            cache.set_entry('selectors', source_url, sorted(content_selectors - {''}), self.get_cache_timeout())
+
+    def get_snapshot_markup(self, instance):
+        """
+        Get the last markup successfully rendered for instance, unless it is
+        older than `PORTAL_PLUGIN_CONTENT_SNAPSHOT_MAX_AGE`.
+        """
+        max_age = get_setting('SNAPSHOT_MAX_AGE')
+        if max_age == 0 or not instance.snapshot_markup or not instance.snapshot_fetched_at:
+            return None
+        age = (timezone.now() - instance.snapshot_fetched_at).total_seconds()
+        if max_age is not None and age > max_age:
+            logger.debug(f"Snapshot of plugin {instance.pk} is {age:.0f} seconds old")
+            return None
+        return instance.snapshot_markup
+
+    def save_snapshot(self, instance, markup):
+        """
+        Store markup as the last successfully rendered for instance.
+
+        To not write on every render, markup is stored only if it changed,
+        or if the stored copy is older than `PORTAL_PLUGIN_CONTENT_CACHE_TIMEOUT`
+        (or than `SNAPSHOT_MIN_INTERVAL`, e.g. if content is not cached).
+        """
+        if get_setting('SNAPSHOT_MAX_AGE') == 0 or instance.pk is None:
+            return
+        now = timezone.now()
+        interval = max(get_setting('CACHE_TIMEOUT') or 0, SNAPSHOT_MIN_INTERVAL)
+        is_recent = (
+            instance.snapshot_fetched_at is not None and
+            (now - instance.snapshot_fetched_at).total_seconds() < interval
+        )
+        if markup == instance.snapshot_markup and is_recent:
+            return
+        RemoteContent.objects.filter(pk=instance.pk).update(
+            snapshot_markup=markup,
+            snapshot_fetched_at=now,
+        )
+        instance.snapshot_markup = markup
+        instance.snapshot_fetched_at = now
+
+    def get_fragment_url(self, instance, request=None):
+        """
+        Get the URL whence a browser loads content of a deferred instance,
+        with the query parameters of request that would be forwarded.
+        """
+        url = reverse('remote_content_fragment', args=[instance.pk])
+        if request and request.GET:
+            allowlist = self.get_forward_params_allowlist(instance)
+            query = urlencode(self.get_forward_params(request, allowlist))
+            if query:
+                url = f"{url}?{query}"
+        return url
+
+    def has_fragment_urls(self):
+        """Whether the project includes URLs (of `urls`) that deferred instances load content from"""
+        try:
+            reverse('remote_content_fragment', args=[0])
+        except NoReverseMatch:
+            return False
+        return True
+
+    def is_deferred(self, instance):
+        """
+        Whether instance renders deferred, i.e. is set to, and can.
+
+        An instance set to be deferred, in a project without URLs to load its
+        content from, renders inline (rather than fail to render the page).
+        """
+        if instance.render_mode != RemoteContent.RENDER_DEFERRED:
+            return False
+        if not self.has_fragment_urls():
+            logger.warning(
+                f"Rendering plugin {instance.pk} inline, because URLs of "
+                f"djangocms_tacc_remote_content.urls are not included"
+            )
+            return False
+        return True
 
     def render(self, context, instance, placeholder):
+        if self.is_deferred(instance):
+            return self.render_deferred(context, instance, placeholder)
+        return self.render_inline(context, instance, placeholder)
+
+    def render_deferred(self, context, instance, placeholder):
+        """Render only what loads content after the page does (see `views.fragment_view`)"""
+        context = super().render(context, instance, placeholder)
+        context['fragment_url'] = self.get_fragment_url(instance, context.get('request'))
+        return context
+
+    def render_inline(self, context, instance, placeholder):
+        """Render remote content with the page"""
+        with metrics.measure_render(type(self)) as measurement:
+            context = self.render_content(context, instance, placeholder, measurement)
+            measurement.bytes_out = len((context.get('markup') or '').encode('utf-8'))
+        return context
+
+    def render_content(self, context, instance, placeholder, measurement):
+        """Render remote content, and note what it measured"""
         context = super().render(context, instance, placeholder)
 
         source_root = self.get_source_root()
-        source_url = self.build_source_url(instance, context.get('request'))
-        source_markup = self.get_source_markup(source_url)
+        cache_timeout = self.get_instance_cache_timeout(instance)
+        with metrics.time_phase(type(self), 'build_url'):
+            source_url = self.build_source_url(instance, context.get('request'))
+        measurement.url = source_url
+        with metrics.time_phase(type(self), 'fetch', source_url):
+            source_markup = self.get_prefetched_source_markup(source_url, context.get('request'), cache_timeout)
+        if source_markup:
+            measurement.bytes_in = len(source_markup.encode('utf-8'))
+        is_snapshot_url = source_url == self.build_source_url(instance)
+
+        if source_markup is None:
+            snapshot_markup = self.get_snapshot_markup(instance) if is_snapshot_url else None
+            if snapshot_markup:
+                logger.warning(f"Rendering snapshot of content from {source_url}")
+                context['markup'] = snapshot_markup
+                return context
 
         if source_markup is None and settings.DEBUG:
             context['error_string'] = f'Unable to fetch content from {source_url}'
             return context
 
-        context['markup'] = self.build_client_markup(source_markup, source_url)
+        context['markup'] = self.get_client_markup(source_markup, source_url, instance.content_selector, cache_timeout)
 
         if context['markup'] is None and settings.DEBUG:
             context['error_string'] = 'Error processing remote content'
             return context
 
+        if context['markup'] is not None and is_snapshot_url:
+            self.save_snapshot(instance, context['markup'])
+
         return context
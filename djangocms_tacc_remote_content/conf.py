@@ -0,0 +1,7 @@
+from django.conf import settings
+
+from . import settings as defaults
+
+def get_setting(name):
+    """Get a `PORTAL_PLUGIN_CONTENT_*` setting from project settings or default"""
+    return getattr(settings, f'PORTAL_PLUGIN_CONTENT_{name}', getattr(defaults, name))
@@ -1,6 +1,9 @@
+import soupsieve
 from django import forms
 from django.utils.translation import gettext_lazy as _
 
+from .models import RemoteContent
+
 class RemoteContentForm(forms.ModelForm):
     remote_path = forms.CharField(
         label=_('Remote Path'),
@@ -8,6 +11,51 @@ class RemoteContentForm(forms.ModelForm):
         required=True
     )
 
+    forward_params = forms.CharField(
+        label=_('Forwarded Query Parameters'),
+        help_text=_('Names of query parameters of this page to add to the remote URL, separated by commas (e.g. "page, tag"). Leave blank to use the site setting.'),
+        required=False
+    )
+
+    content_selector = forms.CharField(
+        label=_('Content Selector'),
+        help_text=_('A CSS selector of the part of the remote content to display (e.g. "main article"). Leave blank to display all of it.'),
+        required=False
+    )
+
+    render_mode = forms.ChoiceField(
+        label=_('Render Mode'),
+        choices=RemoteContent.RENDER_MODES,
+        initial=RemoteContent.RENDER_INLINE,
+        help_text=_('Whether to load remote content with the page, or after it loads (so a slow remote site does not slow the page).'),
+    )
+
+    cache_timeout = forms.IntegerField(
+        label=_('Cache Timeout'),
+        min_value=0,
+        help_text=_('Seconds to display content before fetching it again, whatever the remote site says. Leave blank to do as the remote site says (else as the site setting).'),
+        required=False
+    )
+
+    never_cache = forms.BooleanField(
+        label=_('Never Cache'),
+        help_text=_('Fetch content on every page view (e.g. if it changes on every request). This slows the page.'),
+        required=False
+    )
+
+    def clean_content_selector(self):
+        content_selector = self.cleaned_data['content_selector'].strip()
+        if content_selector:
+            try:
+                soupsieve.compile(content_selector)
+            except soupsieve.SelectorSyntaxError as error:
+                raise forms.ValidationError(
+                    _('Enter a valid CSS selector (%(error)s).'),
+                    code='invalid',
+                    params={'error': str(error).splitlines()[0]},
+                )
+        return content_selector
+
     class Meta:
         help_texts = {
             'full_url': _('The complete URL that is currently used to fetch content.')
@@ -20,7 +68,17 @@ fieldsets = [
     (None, {
         'fields': (
             'remote_path',
+            'forward_params',
+            'content_selector',
+            'render_mode',
             'full_url',
         )
     }),
+    (_('Caching'), {
+        'classes': ('collapse',),
+        'fields': (
+            'cache_timeout',
+            'never_cache',
+        )
+    }),
 ]
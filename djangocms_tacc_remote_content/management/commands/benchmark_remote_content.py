@@ -0,0 +1,143 @@
+import json
+import platform
+
+import bs4
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from ... import benchmark
+from ...cms_plugins import RemoteContentPlugin
+from ...models import RemoteContent
+
+class Command(BaseCommand):
+    help = 'Time transforming and rendering synthetic remote content, and compare to a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=benchmark.PAGE_SIZES,
+            help='Sizes (in KB) of pages to transform and render',
+        )
+        parser.add_argument(
+            '--selectors', type=int, nargs='+', default=(0, 2, 8),
+            help='Lengths of lists of selectors whose relative URLs to keep',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='How many times to time each benchmark (the median is compared)',
+        )
+        parser.add_argument(
+            '--latency', type=float, default=0.05,
+            help='Seconds that the local server waits before responding',
+        )
+        parser.add_argument(
+            '--output', help='Path of a JSON file to write results to',
+        )
+        parser.add_argument(
+            '--baseline', help='Path of a JSON file of results (from --output) to compare to',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='How much slower than baseline (e.g. 0.2 for 20%%) counts as a regression',
+        )
+
+    def get_environment(self):
+        """Describe what results depend on, besides code"""
+        return {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'beautifulsoup': bs4.__version__,
+            'parser': RemoteContentPlugin().get_parser(),
+            'machine': platform.machine(),
+        }
+
+    def benchmark_transforms(self, options):
+        plugin = RemoteContentPlugin()
+        source_url = 'https://tacc.utexas.edu/news/'
+        for size in options['sizes']:
+            page = benchmark.build_page(size)
+
+            with override_settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=False):
+                yield f"build_client_markup/{size}kb/stream", benchmark.measure(
+                    lambda: plugin.build_client_markup(page, source_url), options['repeat'],
+                )
+            for count in options['selectors']:
+                selectors = benchmark.get_selectors(count)
+                with override_settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=selectors):
+                    yield f"build_client_markup/{size}kb/selectors-{count}", benchmark.measure(
+                        lambda: plugin.build_client_markup(page, source_url), options['repeat'],
+                    )
+
+            soup = bs4.BeautifulSoup(page, plugin.get_parser())
+            tags = soup.find_all(True)
+            for count in options['selectors']:
+                selectors = benchmark.get_selectors(count)
+
+                def keep_relative():
+                    relative_elements = plugin.get_transform_plan(selectors).select_relative_elements(soup)
+                    for tag in tags:
+                        plugin.should_keep_relative(tag, selectors, relative_elements)
+
+                yield f"should_keep_relative/{size}kb/selectors-{count}", benchmark.measure(
+                    keep_relative, options['repeat'],
+                )
+
+        for count in (1, 5, 20):
+            srcset = benchmark.build_srcset(count)
+            yield f"transform_srcset/candidates-{count}", benchmark.measure(
+                lambda: plugin.transform_srcset(srcset, source_url), options['repeat'], number=1000,
+            )
+
+    def benchmark_renders(self, options, server):
+        """Time rendering (without cache) of content from the local server"""
+        plugin = RemoteContentPlugin()
+        with override_settings(
+            PORTAL_PLUGIN_CONTENT_NETLOC=server.url,
+            PORTAL_PLUGIN_CONTENT_CACHE_TIMEOUT=0,
+            PORTAL_PLUGIN_CONTENT_SNAPSHOT_MAX_AGE=0,
+            PORTAL_PLUGIN_CONTENT_BREAKER_THRESHOLD=0,
+        ):
+            for size in options['sizes']:
+                # Not saved, so as to not change the database
+                instance = RemoteContent(remote_path=f"/{size}/?delay={options['latency']}")
+
+                def render():
+                    if not plugin.render({}, instance, None).get('markup'):
+                        raise CommandError(f"Failed to render content from {server.url}")
+
+                render()
+                yield f"render/{size}kb", benchmark.measure(render, options['repeat'])
+
+    def handle(self, *args, **options):
+        results = {}
+        with benchmark.StubServer() as server:
+            for name, result in [*self.benchmark_transforms(options), *self.benchmark_renders(options, server)]:
+                results[name] = result
+                self.stdout.write(
+                    f"{name}  median {result['median'] * 1000:.3f}ms  "
+                    f"min {result['min'] * 1000:.3f}ms"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'environment': self.get_environment(), 'results': results}, file, indent=2)
+            self.stdout.write(f"Wrote results to {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+            if baseline['environment'] != self.get_environment():
+                self.stdout.write(self.style.WARNING(
+                    f"Baseline was measured in another environment: {baseline['environment']}"
+                ))
+            comparisons = benchmark.compare(results, baseline['results'], options['tolerance'])
+            for name, ratio, is_regression in comparisons:
+                line = f"{'SLOWER' if is_regression else 'OK'}  {ratio:.2f}x baseline  {name}"
+                self.stdout.write(self.style.ERROR(line) if is_regression else line)
+            regressions = [name for name, _, is_regression in comparisons if is_regression]
+            if regressions:
+                raise CommandError(
+                    f"{len(regressions)} of {len(comparisons)} benchmarks are more than "
+                    f"{options['tolerance']:.0%} slower than baseline"
+                )
+            self.stdout.write(self.style.SUCCESS(f"No regressions in {len(comparisons)} benchmarks"))
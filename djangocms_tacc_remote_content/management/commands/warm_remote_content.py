@@ -0,0 +1,123 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from ...cms_plugins import RemoteContentPlugin
+from ...conf import get_setting
+from ...models import RemoteContent
+
+def build_client_markup(source_markup, source_url, content_selector=''):
+    """Transform remote content (e.g. in a worker process), and time it"""
+    start = time.monotonic()
+    client_markup = RemoteContentPlugin().build_client_markup(source_markup, source_url, content_selector)
+    return client_markup, time.monotonic() - start
+
+class Command(BaseCommand):
+    help = 'Fetch and transform content of every Remote Content plugin, to cache it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=get_setting('FETCH_WORKERS'),
+            help='How many URLs to fetch at once',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='How many processes to transform content with (default: one per CPU; 0: this process)',
+        )
+        parser.add_argument(
+            '--include-drafts', action='store_true',
+            help='Also warm plugins on unpublished (draft) pages',
+        )
+
+    def get_instances(self, include_drafts=False):
+        """Get plugin instances to warm, i.e. published ones that cache content"""
+        instances = RemoteContent.objects.filter(never_cache=False)
+        if not include_drafts:
+            instances = instances.filter(placeholder__page__publisher_is_draft=False)
+        return instances
+
+    def fetch(self, plugin, url, cache_timeout=None):
+        """Fetch (and cache, per `cache_timeout`) content of a URL, and time it"""
+        start = time.monotonic()
+        source_markup = plugin.refresh_source_markup(url, cache_timeout)
+        return source_markup, time.monotonic() - start
+
+    def handle(self, *args, **options):
+        if not get_setting('CACHE_TIMEOUT'):
+            raise CommandError('Caching is disabled (PORTAL_PLUGIN_CONTENT_CACHE_TIMEOUT = 0)')
+
+        plugin = RemoteContentPlugin()
+        # Content of one URL can be transformed per each content selector
+        targets = set()
+        # Content of one URL is cached as long as any instance of it caches it
+        cache_timeouts = {}
+        for instance in self.get_instances(options['include_drafts']):
+            url = plugin.build_source_url(instance)
+            targets.add((url, instance.content_selector))
+            cache_timeout = plugin.get_instance_cache_timeout(instance)
+            if cache_timeout is not None:
+                cache_timeouts[url] = max(cache_timeouts.get(url, 0), cache_timeout)
+        targets = sorted(targets)
+        urls = sorted({url for url, _ in targets})
+        self.stdout.write(f"Warming {len(urls)} URLs")
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            fetches = dict(zip(urls, executor.map(
+                lambda url: self.fetch(plugin, url, cache_timeouts.get(url)), urls
+            )))
+
+        transforms = {}
+        if options['processes'] == 0:
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=options['processes'], initializer=django.setup)
+        try:
+            for target in targets:
+                source_markup, _ = fetches[target[0]]
+                if source_markup is None:
+                    continue
+                if plugin.get_cached_client_markup(source_markup, *target) is not None:
+                    continue
+                if executor:
+                    transforms[target] = executor.submit(build_client_markup, source_markup, *target)
+                else:
+                    transforms[target] = build_client_markup(source_markup, *target)
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+        failures = set()
+        for target in targets:
+            url, content_selector = target
+            label = f"{url}  {content_selector}" if content_selector else url
+            source_markup, fetch_time = fetches[url]
+            if source_markup is None:
+                failures.add(url)
+                self.stdout.write(self.style.ERROR(f"FAILED  fetch {fetch_time:.3f}s  {label}"))
+                continue
+
+            if target in transforms:
+                try:
+                    if executor:
+                        client_markup, transform_time = transforms[target].result()
+                    else:
+                        client_markup, transform_time = transforms[target]
+                except Exception as error:
+                    failures.add(url)
+                    self.stdout.write(self.style.ERROR(f"FAILED  transform: {error}  {label}"))
+                    continue
+                transform_time = f"{transform_time:.3f}s"
+                plugin.set_cached_client_markup(source_markup, url, client_markup, content_selector)
+            else:
+                transform_time = 'cached'
+
+            self.stdout.write(
+                f"OK  fetch {fetch_time:.3f}s  transform {transform_time}  "
+                f"{len(source_markup)} chars  {label}"
+            )
+
+        if failures:
+            raise CommandError(f"Failed to warm {len(failures)} of {len(urls)} URLs")
+        self.stdout.write(self.style.SUCCESS(f"Warmed {len(urls)} URLs"))
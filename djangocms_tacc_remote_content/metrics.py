@@ -0,0 +1,173 @@
+"""
+Measure each phase of rendering remote content.
+
+Phases:
+- build_url: build the remote URL
+- fetch: get remote content (from cache, from prefetch, or from origin)
+- fetch_wait: from sending a request to receiving response headers (i.e.
+  DNS lookup, connection, and origin response time)
+- fetch_transfer: from response headers to last byte of content
+- parse, rewrite, serialize: transform content (streaming only rewrites)
+- render: all of the above, for one plugin
+
+Measurements are sent as signals (see `signals`), and each render is logged
+(at DEBUG level) with its measurements in `extra={'remote_content': {…}}`.
+If `PORTAL_PLUGIN_CONTENT_METRICS` is `True`, measurements are also counted
+in a registry (per process), which admins can view (see `views`), as are
+bytes written to cache (per kind of entry) and entries too large to cache.
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.dispatch import receiver
+
+from . import signals
+from .conf import get_setting
+
+logger = logging.getLogger(f"portal.{__name__}")
+
+# Upper bounds (in seconds) of histogram buckets of phase durations
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+class Measurement:
+    """Measurements of rendering one plugin"""
+    def __init__(self):
+        self.url = None
+        self.timings = {}
+        self.cache = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def as_dict(self):
+        return {
+            'url': self.url,
+            'timings': dict(self.timings),
+            'cache': dict(self.cache),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+        }
+
+# Measurement of the render in progress (in this thread or task)
+_measurement = contextvars.ContextVar('remote_content_measurement', default=None)
+
+class Registry:
+    """Counters and histograms of all measurements, in this process"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = {'buckets': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0}
+                self.histograms[name] = histogram
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][index] += 1
+                    break
+            histogram['count'] += 1
+            histogram['sum'] += value
+
+    def get_snapshot(self):
+        """Get a copy of all counters and histograms (e.g. to serialize as JSON)"""
+        labels = ['+Inf' if bound == float('inf') else str(bound) for bound in BUCKETS]
+        with self.lock:
+            return {
+                'counters': dict(sorted(self.counters.items())),
+                'histograms': {
+                    name: {
+                        'buckets': dict(zip(labels, histogram['buckets'])),
+                        'count': histogram['count'],
+                        'sum': histogram['sum'],
+                        'mean': histogram['sum'] / histogram['count'],
+                    }
+                    for name, histogram in sorted(self.histograms.items())
+                },
+            }
+
+registry = Registry()
+
+def is_enabled():
+    return get_setting('METRICS')
+
+@contextmanager
+def measure_render(sender):
+    """Measure rendering one plugin, including phases timed meanwhile"""
+    measurement = Measurement()
+    token = _measurement.set(measurement)
+    start = time.monotonic()
+    try:
+        yield measurement
+    finally:
+        _measurement.reset(token)
+        measurement.timings['render'] = time.monotonic() - start
+        record_phase(sender, 'render', measurement.timings['render'], measurement.url)
+        signals.content_rendered.send(sender=sender, **measurement.as_dict())
+        logger.debug(
+            f"Rendered {measurement.url} in {measurement.timings['render']:.3f}s",
+            extra={'remote_content': measurement.as_dict()},
+        )
+
+def record_phase(sender, phase, duration, url=None):
+    """Record how long a phase took"""
+    measurement = _measurement.get()
+    if measurement is not None:
+        measurement.timings[phase] = measurement.timings.get(phase, 0) + duration
+    signals.phase_timed.send(sender=sender, phase=phase, duration=duration, url=url)
+
+@contextmanager
+def time_phase(sender, phase, url=None):
+    """Record how long the code within takes, as a phase"""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        record_phase(sender, phase, time.monotonic() - start, url)
+
+def record_cache(sender, cache, result, url=None):
+    """Record whether content was found in a cache"""
+    measurement = _measurement.get()
+    if measurement is not None:
+        measurement.cache[cache] = result
+    signals.cache_looked_up.send(sender=sender, cache=cache, result=result, url=url)
+
+def record_cache_write(kind, size, is_stored):
+    """Count bytes written to cache, per kind of entry, and entries too large to write"""
+    if not is_enabled():
+        return
+    if is_stored:
+        registry.increment(f"cache.{kind}.writes")
+        registry.increment(f"cache.{kind}.bytes_written", size)
+    else:
+        registry.increment(f"cache.{kind}.oversized")
+
+@receiver(signals.phase_timed)
+def observe_phase(phase, duration, **kwargs):
+    if is_enabled():
+        registry.observe(f"phase.{phase}", duration)
+
+@receiver(signals.cache_looked_up)
+def count_cache_result(cache, result, **kwargs):
+    if is_enabled():
+        registry.increment(f"cache.{cache}.{result}")
+
+@receiver(signals.content_rendered)
+def count_render(bytes_in, bytes_out, **kwargs):
+    if is_enabled():
+        registry.increment('renders')
+        registry.increment('bytes_in', bytes_in)
+        registry.increment('bytes_out', bytes_out)
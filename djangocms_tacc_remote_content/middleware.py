@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from cms.utils.helpers import get_header_name
+from django.utils import translation
+from django.utils.deprecation import MiddlewareMixin
+
+from .cms_plugins import QUERY_HEADER, RemoteContentPlugin
+from .models import RemoteContent
+
+logger = logging.getLogger(f"portal.{__name__}")
+
+class RemoteContentPrefetchMiddleware(MiddlewareMixin):
+    """
+    Fetch content for every Remote Content plugin on a CMS page, in parallel,
+    before the page renders; each plugin then renders what was fetched.
+
+    Under WSGI, content is fetched by a shared pool of threads. Under ASGI,
+    content is fetched by tasks of the event loop, so no thread waits on it.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if asyncio.iscoroutinefunction(get_response):
+            self.process_template_response = self.aprocess_template_response
+
+    def get_instances(self, request):
+        """Get plugin instances on the page of request, in its language, to render with it"""
+        page = getattr(request, 'current_page', None)
+        if not page:
+            return []
+        return list(RemoteContent.objects.filter(
+            placeholder__page=page,
+            language=translation.get_language(),
+        ).exclude(render_mode=RemoteContent.RENDER_DEFERRED))
+
+    def process_template_response(self, request, response):
+        instances = self.get_instances(request)
+        if instances:
+            logger.debug(f"Prefetching content for {len(instances)} plugins")
+            plugin = instances[0].get_plugin_class_instance()
+            plugin.prefetch_source_markup(instances, request)
+        return response
+
+    async def aprocess_template_response(self, request, response):
+        instances = await sync_to_async(self.get_instances)(request)
+        if instances:
+            logger.debug(f"Prefetching content for {len(instances)} plugins")
+            plugin = instances[0].get_plugin_class_instance()
+            await plugin.aprefetch_source_markup(instances, request)
+        return response
+
+class RemoteContentQueryMiddleware(MiddlewareMixin):
+    """
+    Set query parameters that Remote Content plugins might forward as a
+    header, so CMS caches a placeholder per value of them (e.g. `?page=2`).
+
+    Only parameters of `PORTAL_PLUGIN_CONTENT_FORWARD_PARAMS`, and of
+    instances that override it, are set (unless the setting is None), so
+    other parameters (e.g. `?nonce=1`) do not add placeholders to cache.
+    """
+    def process_request(self, request):
+        plugin = RemoteContentPlugin()
+        params = plugin.get_forward_params(request, plugin.get_any_forward_params_allowlist())
+        request.META[get_header_name(QUERY_HEADER)] = urlencode(params)
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangocms_tacc_remote_content', '0002_simplify_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='remotecontent',
+            name='snapshot_fetched_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='remotecontent',
+            name='snapshot_markup',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangocms_tacc_remote_content', '0003_remotecontent_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='remotecontent',
+            name='forward_params',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
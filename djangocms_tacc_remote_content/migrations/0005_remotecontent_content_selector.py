@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangocms_tacc_remote_content', '0004_remotecontent_forward_params'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='remotecontent',
+            name='content_selector',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
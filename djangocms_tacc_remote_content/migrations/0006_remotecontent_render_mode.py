@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangocms_tacc_remote_content', '0005_remotecontent_content_selector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='remotecontent',
+            name='render_mode',
+            field=models.CharField(choices=[('inline', 'Inline (with the page)'), ('deferred', 'Deferred (after the page loads)')], default='inline', max_length=16),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangocms_tacc_remote_content', '0006_remotecontent_render_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='remotecontent',
+            name='cache_timeout',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='remotecontent',
+            name='never_cache',
+            field=models.BooleanField(default=False),
+        ),
+    ]
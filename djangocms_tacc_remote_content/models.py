@@ -5,7 +5,25 @@ from django.utils.translation import gettext_lazy as _
 from cms.models.pluginmodel import CMSPlugin
 
 class RemoteContent(CMSPlugin):
+    RENDER_INLINE = 'inline'
+    RENDER_DEFERRED = 'deferred'
+    RENDER_MODES = [
+        (RENDER_INLINE, _('Inline (with the page)')),
+        (RENDER_DEFERRED, _('Deferred (after the page loads)')),
+    ]
+
     remote_path = models.CharField(max_length=255)
+    forward_params = models.CharField(max_length=255, blank=True)
+    content_selector = models.CharField(max_length=255, blank=True)
+    render_mode = models.CharField(max_length=16, choices=RENDER_MODES, default=RENDER_INLINE)
+
+    # How long content is fresh for, instead of what its response says
+    cache_timeout = models.PositiveIntegerField(blank=True, null=True)
+    never_cache = models.BooleanField(default=False)
+
+    # Last markup successfully rendered, to render if remote content fails
+    snapshot_markup = models.TextField(blank=True, default='', editable=False)
+    snapshot_fetched_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     def __str__(self):
         return self.remote_path
@@ -0,0 +1,89 @@
+"""
+Plans to transform remote content, prepared once per distinct value of
+`PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS`.
+
+A plan holds what every element of content would otherwise recompute: which
+mode to transform in, and compiled selectors. Relative URLs are resolved via
+a bounded cache, since pages (and pages from one origin) repeat them.
+
+Plans (and resolved URLs) are forgotten when a setting they depend on changes.
+"""
+from functools import lru_cache
+from urllib.parse import urljoin
+
+import soupsieve
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .client import get_origin
+
+# How many plans (and compiled selector lists) to remember
+PLAN_CACHE_SIZE = 256
+# How many resolved URLs to remember
+URL_CACHE_SIZE = 4096
+
+class TransformPlan:
+    """
+    How to transform content, per one value of a setting.
+
+    Args:
+        use_relative: Value of `PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS`,
+            with a list as a tuple
+    """
+    def __init__(self, use_relative):
+        self.use_relative = use_relative
+        self.selector = compile_selectors(use_relative) if isinstance(use_relative, tuple) else None
+
+    def select_relative_elements(self, soup):
+        """
+        Find elements whose relative URLs to keep, in one pass over `soup`.
+
+        Returns:
+            A set of `id()` of matched elements, or None if setting is not a list
+        """
+        if not isinstance(self.use_relative, tuple):
+            return None
+        if self.selector is None:
+            return set()
+        return {id(element) for element in self.selector.select(soup)}
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def get_plan(use_relative):
+    """Get the plan for a setting value (with a list as a tuple)"""
+    return TransformPlan(use_relative)
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_selectors(selectors):
+    """
+    Compile a tuple of CSS selectors into one selector that matches any.
+
+    Returns:
+        A compiled selector, or None if the tuple is empty
+    """
+    if not selectors:
+        return None
+    return soupsieve.compile(', '.join(selectors))
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def resolve_url(source_url, url):
+    """
+    Resolve a relative URL against a source URL, like `urljoin`.
+
+    A root-relative path without dot segments (e.g. "/news/") is appended to
+    the origin of the source URL, rather than joined to the source URL.
+    """
+    if url.startswith('/') and not url.startswith('//') and '/.' not in url:
+        return get_origin(source_url) + url
+    return urljoin(source_url, url)
+
+def clear():
+    """Forget every plan, compiled selector, and resolved URL"""
+    get_plan.cache_clear()
+    compile_selectors.cache_clear()
+    resolve_url.cache_clear()
+
+@receiver(setting_changed)
+def clear_plans(setting, **kwargs):
+    """Rebuild plans when a setting they depend on changes (e.g. in tests)"""
+    if setting == 'PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS':
+        clear()
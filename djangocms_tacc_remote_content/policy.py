@@ -0,0 +1,71 @@
+"""
+How long fetched content may be cached, per headers of its response.
+
+An origin says so via `Cache-Control` and `Expires` (see RFC 9111). The plugin
+is a shared cache (it serves one copy of content to every visitor), so
+`s-maxage` takes precedence over `max-age`, and `private` means `no-store`.
+"""
+import time
+
+from django.utils.http import parse_http_date_safe
+
+def parse_cache_control(value):
+    """
+    Parse a `Cache-Control` header into its directives.
+
+    Returns:
+        A dict of (lowercase) directive name to its value, or to True if it
+        has none, e.g. `{'max-age': '60', 'no-store': True}`
+    """
+    directives = {}
+    for directive in (value or '').split(','):
+        name, _, argument = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip().strip('"') if argument else True
+    return directives
+
+def parse_seconds(value):
+    """Parse a count of seconds (a negative count is 0), or None if invalid"""
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+def get_policy(headers, now=None):
+    """
+    Get how long content of a response may be cached, per its headers.
+
+    Returns:
+        A dict of:
+        - no_store: Whether content must not be cached
+        - max_age: Seconds content is fresh for (already less its `Age`)
+        - stale_while_revalidate: Seconds after that to serve it while it is
+          fetched again
+        - stale_if_error: Seconds after that to serve it if it fails to fetch
+        where seconds are None if the origin did not say
+    """
+    directives = parse_cache_control(headers.get('Cache-Control'))
+    policy = {
+        'no_store': 'no-store' in directives or 'private' in directives,
+        'max_age': None,
+        'stale_while_revalidate': parse_seconds(directives.get('stale-while-revalidate')),
+        'stale_if_error': parse_seconds(directives.get('stale-if-error')),
+    }
+
+    if 'no-cache' in directives:
+        # Must be fetched again (conditionally) before every use
+        policy['max_age'] = 0
+        policy['stale_while_revalidate'] = 0
+    elif 's-maxage' in directives or 'max-age' in directives:
+        policy['max_age'] = parse_seconds(directives.get('s-maxage', directives.get('max-age')))
+    elif headers.get('Expires'):
+        expires = parse_http_date_safe(headers['Expires'])
+        date = parse_http_date_safe(headers.get('Date') or '') or (now or time.time())
+        # An invalid date (e.g. "0") means already expired
+        policy['max_age'] = max(0, int(expires - date)) if expires is not None else 0
+
+    age = parse_seconds(headers.get('Age'))
+    if policy['max_age'] and age:
+        policy['max_age'] = max(0, policy['max_age'] - age)
+
+    return policy
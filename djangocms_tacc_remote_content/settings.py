@@ -1,5 +1,12 @@
 NETLOC = 'https://tacc.utexas.edu/'
 
+# Which query parameters (of a page with the plugin) to forward to remote URL
+# (None to forward any); each plugin instance can override this
+FORWARD_PARAMS = None
+# FORWARD_PARAMS = ['page', 'tag']
+# Which query parameters to never forward (supports wildcards)
+IGNORE_PARAMS = ['utm_*', 'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga']
+
 # Whether to keep relative paths as-is (True) or not (False)
 USE_RELATIVE_PATHS = False
 # To keep relative paths as-is for specific elements via CSS selectors
@@ -9,3 +16,63 @@ USE_RELATIVE_PATHS = False
 #     '.docs-section img[src*="local"]',     # Combined class and attribute contains
 #     '[data-keep-relative]'                 # Custom data attribute
 # ]
+
+# How many connections to keep open per remote origin (per process)
+POOL_SIZE = 10
+# Seconds to wait to connect to, and then to read from, the remote origin
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+# Most bytes to download, and most seconds to take, per fetch
+MAX_BYTES = 5 * 1024 * 1024
+DEADLINE = 20
+# Whether to reuse connections between fetches
+KEEP_ALIVE = True
+# Seconds that concurrent renders wait on one fetch (or transform) of the same
+# content (at least DEADLINE + CONNECT_TIMEOUT, to outlast a fetch), and how
+# often (in seconds) to check for it from other processes
+COALESCE_TIMEOUT = 25
+COALESCE_POLL_INTERVAL = 0.05
+# How many failures in a row (per origin) before not fetching from it (0 to
+# always fetch), and for how many seconds to not fetch from it
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30
+# How many URLs to fetch at once (per process) e.g. for plugins on one page
+FETCH_WORKERS = 8
+# Whether to fetch and transform content (in background) when a plugin is saved
+WARM_ON_SAVE = True
+
+# Which cache (of `CACHES`) stores fetched remote content
+CACHE_ALIAS = 'default'
+# Seconds to serve fetched content without fetching again (0 to not cache)
+CACHE_TIMEOUT = 300
+# Seconds after that to serve old content while it is fetched in background
+CACHE_STALE_TIMEOUT = 60
+# Whether to cache content as long as headers of its response say (i.e.
+# `Cache-Control` and `Expires`), instead of the timeouts above
+CACHE_HEADERS = True
+# Which compressor to compress cached entries with ('zlib', or 'lz4' if
+# installed), or a list of them in order of preference; the first one
+# installed is used (None to not compress)
+CACHE_COMPRESSOR = 'zlib'
+# CACHE_COMPRESSOR = ['lz4', 'zlib']
+# Bytes an entry must be (pickled) to be compressed
+CACHE_COMPRESS_MIN_SIZE = 1024
+# Most bytes an entry may be (after compression) to be cached (None for no limit)
+CACHE_MAX_ENTRY_SIZE = 1024 * 1024
+# Secret by which the remote site signs requests to invalidate cached content
+# (None to not accept them), and how old (in seconds) a request may be
+WEBHOOK_SECRET = None
+WEBHOOK_MAX_AGE = 300
+
+# Which parser to transform remote content with, or a list of them in order
+# of preference; the first one installed is used
+PARSER = 'html.parser'
+# PARSER = ['lxml', 'html.parser']
+
+# Whether to count timings, cache results, and sizes of rendered content (per
+# process), to view them in admin (measurements are always sent as signals)
+METRICS = False
+
+# Seconds that the last successfully rendered content may be rendered again,
+# if remote content fails to load (None for no limit, 0 to not store it)
+SNAPSHOT_MAX_AGE = 60 * 60 * 24 * 7
@@ -0,0 +1,20 @@
+"""
+Signals sent while rendering remote content, to measure it.
+
+Each is sent with `sender` as the plugin class (e.g. `RemoteContentPlugin`).
+"""
+from django.dispatch import Signal
+
+# A phase of rendering finished
+# Args: phase (e.g. "fetch", "parse"), duration (seconds), url
+phase_timed = Signal()
+
+# A cache of content was looked up
+# Args: cache ("source" or "client"), result ("hit", "stale", "expired", or
+#     "miss"), url
+cache_looked_up = Signal()
+
+# A plugin rendered
+# Args: url, timings (seconds per phase), cache (result per cache),
+#     bytes_in (of remote content), bytes_out (of rendered markup)
+content_rendered = Signal()
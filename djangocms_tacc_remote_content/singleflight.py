@@ -0,0 +1,151 @@
+"""
+Run a call only once at a time per key, while other callers wait on it.
+
+Within a process, callers share the result of one call. Across processes,
+one caller holds a short lock in the cache, while others poll the cache for
+its result.
+
+Async callers (e.g. of ASGI renders) do the same via `arun`, but share a call
+per event loop, and wait on others without blocking their loop.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+
+from . import cache
+from .conf import get_setting
+
+logger = logging.getLogger(f"portal.{__name__}")
+
+_calls = {}
+_calls_lock = threading.Lock()
+# Per event loop (whose calls do not share a thread, so need no lock)
+_async_calls = {}
+
+def run(key, function, poll):
+    """
+    Call `function` unless a call for `key` is in progress, then share its result.
+
+    Args:
+        key: What identifies the call, e.g. a URL
+        function: What to call, whose result is stored (e.g. cached) by it
+        poll: What to call to read a result stored by another process, which
+            returns None until there is one
+
+    Returns:
+        The result of `function`, or of `poll` if another process called it
+        (but of `function` if that call ended without a result to poll)
+    """
+    with _calls_lock:
+        future = _calls.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _calls[key] = future
+
+    if not is_leader:
+        logger.debug(f"Waiting on call in progress for {key}")
+        return future.result()
+
+    try:
+        result = run_across_processes(key, function, poll)
+    except BaseException as error:
+        future.set_exception(error)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _calls_lock:
+            del _calls[key]
+
+def run_across_processes(key, function, poll):
+    """Call `function` if no other process is, else poll for its result"""
+    timeout = get_setting('COALESCE_TIMEOUT')
+    if cache.add_entry('flight', key, True, timeout):
+        try:
+            return function()
+        finally:
+            cache.delete_entry('flight', key)
+
+    logger.debug(f"Polling for result of call in another process for {key}")
+    interval = get_setting('COALESCE_POLL_INTERVAL')
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        result = poll()
+        if result is not None:
+            return result
+        if cache.get_entry('flight', key) is None:
+            break
+    result = poll()
+    if result is None:
+        # Other process failed, stalled, or stored nothing (e.g. `no-store`)
+        logger.debug(f"Calling after call in another process ended without result for {key}")
+        result = function()
+    return result
+
+async def arun(key, function, poll):
+    """
+    Call `function` like `run`, but await it, and wait without blocking.
+
+    Args:
+        key: What identifies the call, e.g. a URL
+        function: What to call, which returns a coroutine
+        poll: What to call (not async) to read a result stored by another
+            process (or event loop), which returns None until there is one
+    """
+    loop = asyncio.get_running_loop()
+    future = _async_calls.get((loop, key))
+    if future is not None:
+        logger.debug(f"Waiting on call in progress for {key}")
+        # Do not cancel the call if this caller is
+        return await asyncio.shield(future)
+
+    future = loop.create_future()
+    _async_calls[(loop, key)] = future
+    try:
+        result = await arun_across_processes(key, function, poll)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as error:
+        future.set_exception(error)
+        # Retrieve it, so it is not logged if no caller waited on it
+        future.exception()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        del _async_calls[(loop, key)]
+
+async def arun_across_processes(key, function, poll):
+    """Await `function` if no other process is, else poll for its result"""
+    timeout = get_setting('COALESCE_TIMEOUT')
+    if await sync_to_async(cache.add_entry, thread_sensitive=False)('flight', key, True, timeout):
+        try:
+            return await function()
+        finally:
+            await sync_to_async(cache.delete_entry, thread_sensitive=False)('flight', key)
+
+    logger.debug(f"Polling for result of call in another process for {key}")
+    interval = get_setting('COALESCE_POLL_INTERVAL')
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(interval)
+        result = await sync_to_async(poll, thread_sensitive=False)()
+        if result is not None:
+            return result
+        if await sync_to_async(cache.get_entry, thread_sensitive=False)('flight', key) is None:
+            break
+    result = await sync_to_async(poll, thread_sensitive=False)()
+    if result is None:
+        # Other process failed, stalled, or stored nothing (e.g. `no-store`)
+        logger.debug(f"Calling after call in another process ended without result for {key}")
+        result = await function()
+    return result
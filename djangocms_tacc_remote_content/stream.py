@@ -0,0 +1,64 @@
+from html import escape
+from html.parser import HTMLParser
+
+class StreamingRewriter(HTMLParser):
+    """
+    Transform relative URLs in markup as it is tokenized, without a tree.
+
+    Only tags with a transformed attribute are serialized again; all other
+    markup is written as it was. Output is written in chunks, via `write`.
+
+    Args:
+        transform_tag: A callable that takes a tag name and its attributes (as
+            a list of name-value pairs) and returns new attributes, or None
+            if attributes did not change
+        write: A callable that takes each chunk of output
+    """
+    def __init__(self, transform_tag, write):
+        super().__init__(convert_charrefs=False)
+        self.transform_tag = transform_tag
+        self.write = write
+
+    def write_tag(self, tag, attrs, is_self_closing):
+        transformed_attrs = self.transform_tag(tag, attrs)
+        if transformed_attrs is None:
+            self.write(self.get_starttag_text())
+            return
+        markup = [f'<{tag}']
+        for name, value in transformed_attrs:
+            if value is None:
+                markup.append(f' {name}')
+            else:
+                markup.append(f' {name}="{escape(value)}"')
+        markup.append(' />' if is_self_closing else '>')
+        self.write(''.join(markup))
+
+    def handle_starttag(self, tag, attrs):
+        self.write_tag(tag, attrs, is_self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self.write_tag(tag, attrs, is_self_closing=True)
+
+    def handle_endtag(self, tag):
+        self.write(f'</{tag}>')
+
+    def handle_data(self, data):
+        self.write(data)
+
+    def handle_entityref(self, name):
+        self.write(f'&{name};')
+
+    def handle_charref(self, name):
+        self.write(f'&#{name};')
+
+    def handle_comment(self, data):
+        self.write(f'<!--{data}-->')
+
+    def handle_decl(self, decl):
+        self.write(f'<!{decl}>')
+
+    def handle_pi(self, data):
+        self.write(f'<?{data}>')
+
+    def unknown_decl(self, data):
+        self.write(f'<![{data}]>')
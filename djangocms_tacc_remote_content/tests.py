@@ -1,7 +1,15 @@
+import asyncio
+import threading
+import time
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from asgiref.sync import sync_to_async
 from django.test import TestCase, override_settings
 from django.conf import settings
 from unittest.mock import patch, MagicMock
 from bs4 import BeautifulSoup
+from soupsieve import SoupSieve
 from urllib.parse import urljoin
 
 from cms.api import add_plugin
@@ -11,6 +19,13 @@ from cms.plugin_rendering import ContentRenderer
 from .models import RemoteContent
 from .cms_plugins import RemoteContentPlugin
 from . import settings as defaults
+from . import breaker
+from . import cache
+from . import client
+from . import metrics
+from . import plans
+from . import policy
+from . import signals
 
 class RemoteContentPluginTests(TestCase):
     def setUp(self):
@@ -27,6 +42,8 @@ class RemoteContentPluginTests(TestCase):
         )
         self.plugin_instance = self.plugin.get_plugin_class_instance()
         self.renderer = ContentRenderer(request=None)
+        cache.get_cache().clear()
+        breaker.reset()
 
     def test_plugin_context(self):
         """Test plugin generates correct context"""
@@ -50,21 +67,22 @@ class RemoteContentPluginTests(TestCase):
             source_root = self.plugin_instance.get_source_root()
             self.assertEqual(source_root, defaults.NETLOC)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_content_fetching_success(self, mock_get):
         """Test successful content fetching"""
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {}
         mock_get.return_value = mock_response
 
         url = "https://example.com/about"
         content = self.plugin_instance.get_source_markup(url)
 
         self.assertEqual(content, "<div>Test Content</div>")
-        mock_get.assert_called_once_with(url)
+        mock_get.assert_called_once_with(url, stream=True, timeout=(defaults.CONNECT_TIMEOUT, defaults.READ_TIMEOUT))
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_content_fetching_failure(self, mock_get):
         """Test failed content fetching"""
         mock_response = MagicMock()
@@ -75,7 +93,476 @@ class RemoteContentPluginTests(TestCase):
         content = self.plugin_instance.get_source_markup(url)
 
         self.assertIsNone(content)
-        mock_get.assert_called_once_with(url)
+        mock_get.assert_called_once_with(url, stream=True, timeout=(defaults.CONNECT_TIMEOUT, defaults.READ_TIMEOUT))
+
+    @patch("requests.Session.get")
+    def test_content_fetching_error(self, mock_get):
+        """Test content fetching that times out or cannot connect"""
+        mock_get.side_effect = requests.Timeout()
+
+        content = self.plugin_instance.get_source_markup("https://example.com/slow")
+
+        self.assertIsNone(content)
+
+    @override_settings(
+        PORTAL_PLUGIN_CONTENT_POOL_SIZE=3,
+        PORTAL_PLUGIN_CONTENT_CONNECT_TIMEOUT=1,
+        PORTAL_PLUGIN_CONTENT_READ_TIMEOUT=2,
+    )
+    def test_connection_pooling(self):
+        """Test fetches share one session per origin, with settings applied"""
+        session = client.get_session("https://example.com/about")
+        self.assertIs(session, client.get_session("https://example.com/news/?page=2"))
+        self.assertIsNot(session, client.get_session("https://other.example.com/"))
+        self.assertEqual(session.get_adapter("https://example.com/")._pool_maxsize, 3)
+        self.assertEqual(client.get_timeout(), (1, 2))
+
+    @patch("requests.Session.get")
+    def test_content_caching(self, mock_get):
+        """Test fetched content is cached, unless caching is disabled"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        url = "https://example.com/about"
+        self.assertEqual(self.plugin_instance.fetch_source_markup(url), "<div>Test Content</div>")
+        self.assertEqual(self.plugin_instance.fetch_source_markup(url), "<div>Test Content</div>")
+        self.assertEqual(mock_get.call_count, 1)
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_CACHE_TIMEOUT=0):
+            self.plugin_instance.fetch_source_markup(url)
+            self.plugin_instance.fetch_source_markup(url)
+        self.assertEqual(mock_get.call_count, 3)
+
+    @patch("threading.Thread.start", lambda thread: thread.run())
+    @patch("requests.Session.get")
+    def test_content_caching_stale_while_revalidate(self, mock_get):
+        """Test expired content is served while it is fetched again"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>New Content</div>"
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        url = "https://example.com/about"
+        cache.set_entry('source', url, {
+            'markup': "<div>Old Content</div>",
+            'fetched_at': time.time() - 400,
+            'expires_at': time.time() - 100,
+        }, 60)
+
+        self.assertEqual(self.plugin_instance.fetch_source_markup(url), "<div>Old Content</div>")
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(self.plugin_instance.fetch_source_markup(url), "<div>New Content</div>")
+        self.assertEqual(mock_get.call_count, 1)
+
+    @override_settings(PORTAL_PLUGIN_CONTENT_CONNECT_TIMEOUT=1, PORTAL_PLUGIN_CONTENT_DEADLINE=30)
+    @patch("threading.Thread.start")
+    def test_content_caching_refresh_lock(self, mock_start):
+        """Test a fetch in background is locked for as long as the fetch may take"""
+        url = "https://example.com/about"
+        with patch.object(cache, 'add_entry', wraps=cache.add_entry) as mock_add:
+            self.assertIsNotNone(self.plugin_instance.refresh_in_background(url))
+            self.assertIsNone(self.plugin_instance.refresh_in_background(url))
+        mock_add.assert_called_with('refresh', url, True, 31)
+        self.assertEqual(mock_start.call_count, 1)
+        cache.delete_entry('refresh', url)
+
+    @patch.object(RemoteContentPlugin, "build_client_markup", return_value="<div>Client Content</div>")
+    @patch("requests.Session.get")
+    def test_content_revalidation(self, mock_get, mock_build):
+        """Test expired content is revalidated, and not transformed again if not modified"""
+        url = "https://example.com/about"
+        modified_response = MagicMock()
+        modified_response.status_code = 200
+        modified_response.text = "<div>Test Content</div>"
+        modified_response.headers = {'ETag': '"v1"', 'Last-Modified': 'Wed, 14 Oct 2026 12:00:00 GMT'}
+        not_modified_response = MagicMock()
+        not_modified_response.status_code = 304
+        not_modified_response.headers = {}
+        mock_get.side_effect = [modified_response, not_modified_response]
+
+        source_markup = self.plugin_instance.refresh_source_markup(url)
+        self.plugin_instance.get_client_markup(source_markup, url)
+        self.plugin_instance.get_client_markup(source_markup, url, 'div')
+        self.assertEqual(mock_build.call_count, 2)
+
+        with patch.object(cache, 'touch_entry', wraps=cache.touch_entry) as mock_touch:
+            source_markup = self.plugin_instance.refresh_source_markup(url)
+        self.assertEqual(source_markup, "<div>Test Content</div>")
+        # Transformed markup is extended for every selector it was transformed with
+        touched = {call.args[1] for call in mock_touch.call_args_list if call.args[0] == 'client'}
+        self.assertEqual(touched, {
+            self.plugin_instance.get_client_markup_identity(source_markup, url),
+            self.plugin_instance.get_client_markup_identity(source_markup, url, 'div'),
+        })
+        mock_get.assert_called_with(url, headers={
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Wed, 14 Oct 2026 12:00:00 GMT',
+        }, stream=True, timeout=(defaults.CONNECT_TIMEOUT, defaults.READ_TIMEOUT))
+        self.assertGreater(cache.get_entry('source', url)['expires_at'], time.time())
+
+        client_markup = self.plugin_instance.get_client_markup(source_markup, url)
+        self.assertEqual(client_markup, "<div>Client Content</div>")
+        self.plugin_instance.get_client_markup(source_markup, url, 'div')
+        self.assertEqual(mock_build.call_count, 2)
+
+    @patch("requests.Session.get")
+    def test_cache_control(self, mock_get):
+        """Test content is cached as long as its response says, and not at all if it says so"""
+        self.assertEqual(
+            policy.get_policy({'Cache-Control': 'public, max-age=60, s-maxage=600', 'Age': '100'}),
+            {'no_store': False, 'max_age': 500, 'stale_while_revalidate': None, 'stale_if_error': None},
+        )
+        self.assertEqual(
+            policy.get_policy({'Expires': 'Wed, 14 Oct 2026 12:10:00 GMT', 'Date': 'Wed, 14 Oct 2026 12:00:00 GMT'})['max_age'],
+            600,
+        )
+        self.assertEqual(policy.get_policy({'Expires': '0'})['max_age'], 0)
+        self.assertTrue(policy.get_policy({'Cache-Control': 'private'})['no_store'])
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {'Cache-Control': 'max-age=3600, stale-if-error=86400'}
+        mock_get.return_value = mock_response
+
+        url = "https://example.com/about"
+        self.plugin_instance.fetch_source_markup(url)
+        entry = cache.get_entry('source', url)
+        self.assertAlmostEqual(entry['expires_at'] - entry['fetched_at'], 3600)
+        with self.settings(PORTAL_PLUGIN_CONTENT_CACHE_HEADERS=False):
+            self.plugin_instance.refresh_source_markup(url)
+        entry = cache.get_entry('source', url)
+        self.assertAlmostEqual(entry['expires_at'] - entry['fetched_at'], defaults.CACHE_TIMEOUT)
+
+        # Past stale-while-revalidate, content is fetched before it is served,
+        # unless that fails within stale-if-error
+        self.plugin_instance.refresh_source_markup(url)
+        entry = cache.get_entry('source', url)
+        entry['fetched_at'] -= 3700
+        entry['expires_at'] -= 3700
+        cache.set_entry('source', url, entry, 60)
+        mock_get.side_effect = requests.ConnectionError()
+        self.assertEqual(self.plugin_instance.fetch_source_markup(url), "<div>Test Content</div>")
+        self.assertEqual(mock_get.call_count, 4)
+
+        mock_get.side_effect = None
+        mock_response.headers = {'Cache-Control': 'no-store'}
+        cache.delete_entry('source', url)
+        self.assertEqual(self.plugin_instance.fetch_source_markup(url), "<div>Test Content</div>")
+        self.assertEqual(self.plugin_instance.fetch_source_markup(url), "<div>Test Content</div>")
+        self.assertEqual(mock_get.call_count, 6)
+        self.assertNotIn('markup', cache.get_entry('source', url))
+        self.plugin_instance.get_client_markup("<div>Test Content</div>", url)
+        self.assertIsNone(self.plugin_instance.get_cached_client_markup("<div>Test Content</div>", url))
+
+    @patch("requests.Session.get")
+    def test_instance_cache_policy(self, mock_get):
+        """Test an instance can override how long its content is fresh, and placeholders are cached only that long"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {'Cache-Control': 'max-age=60'}
+        mock_get.return_value = mock_response
+
+        url = self.plugin_instance.build_source_url(self.plugin)
+        self.plugin_instance.render({}, self.plugin, None)
+        expiration = self.plugin_instance.get_cache_expiration(None, self.plugin, None)
+        self.assertTrue(50 < expiration.total_seconds() <= 60)
+
+        self.plugin.cache_timeout = 3600
+        expiration = self.plugin_instance.get_cache_expiration(None, self.plugin, None)
+        self.assertTrue(3590 < expiration.total_seconds() <= 3600)
+        # Content older than the origin says, but not than the instance says, is fresh
+        entry = cache.get_entry('source', url)
+        entry['fetched_at'] -= 120
+        entry['expires_at'] -= 120
+        cache.set_entry('source', url, entry, 60)
+        self.plugin_instance.render({}, self.plugin, None)
+        self.assertEqual(mock_get.call_count, 1)
+
+        self.plugin.never_cache = True
+        self.plugin_instance.render({}, self.plugin, None)
+        self.plugin_instance.render({}, self.plugin, None)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(self.plugin_instance.get_cache_expiration(None, self.plugin, None).total_seconds(), 0)
+
+        self.plugin.render_mode = RemoteContent.RENDER_DEFERRED
+        self.assertIsNone(self.plugin_instance.get_cache_expiration(None, self.plugin, None))
+
+    def test_cache_compression(self):
+        """Test large entries are compressed, and entries too large are not cached"""
+        markup = "<div>Test Content</div>" * 1000
+        for compressor in ('zlib', 'lz4'):
+            with self.subTest(compressor=compressor), self.settings(PORTAL_PLUGIN_CONTENT_CACHE_COMPRESSOR=compressor):
+                if compressor not in cache.COMPRESSORS:
+                    self.skipTest(f"{compressor} is not installed")
+                self.assertTrue(cache.set_entry('client', 'large', markup, 60))
+                stored = cache.get_cache().get(cache.make_key('client', 'large'))
+                self.assertIsInstance(stored, cache.Compressed)
+                self.assertEqual(stored.compressor, compressor)
+                self.assertLess(len(stored.payload), len(markup))
+                self.assertEqual(cache.get_entry('client', 'large'), markup)
+
+        cache.set_entry('client', 'small', "<div>Test Content</div>", 60)
+        self.assertEqual(cache.get_cache().get(cache.make_key('client', 'small')), "<div>Test Content</div>")
+        with self.settings(PORTAL_PLUGIN_CONTENT_CACHE_COMPRESSOR=None):
+            cache.set_entry('client', 'large', markup, 60)
+            self.assertEqual(cache.get_cache().get(cache.make_key('client', 'large')), markup)
+
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        with self.settings(PORTAL_PLUGIN_CONTENT_CACHE_MAX_ENTRY_SIZE=100, PORTAL_PLUGIN_CONTENT_METRICS=True):
+            with self.assertLogs('portal.djangocms_tacc_remote_content.cache', 'WARNING'):
+                self.assertFalse(cache.set_entry('client', 'large', markup, 60))
+            self.assertIsNone(cache.get_entry('client', 'large'))
+            self.assertTrue(cache.set_entry('client', 'small', "<div>Test Content</div>", 60))
+        counters = metrics.registry.get_snapshot()['counters']
+        self.assertEqual(counters['cache.client.oversized'], 1)
+        self.assertEqual(counters['cache.client.writes'], 1)
+        self.assertGreater(counters['cache.client.bytes_written'], 0)
+
+    def test_client_markup_caching(self):
+        """Test transformed markup is reused only for identical content, URL, and settings"""
+        source_url = "https://example.com/"
+        build_client_markup = self.plugin_instance.build_client_markup
+        with patch.object(RemoteContentPlugin, "build_client_markup", side_effect=build_client_markup) as mock_build:
+            first = self.plugin_instance.get_client_markup('<a href="/page">Page</a>', source_url)
+            second = self.plugin_instance.get_client_markup('<a href="/page">Page</a>', source_url)
+            self.assertEqual(first, second)
+            self.assertEqual(mock_build.call_count, 1)
+
+            self.plugin_instance.get_client_markup('<a href="/other">Other</a>', source_url)
+            self.assertEqual(mock_build.call_count, 2)
+
+            self.plugin_instance.get_client_markup('<a href="/page">Page</a>', "https://example.com/news/")
+            self.assertEqual(mock_build.call_count, 3)
+
+            with self.settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=True):
+                relative = self.plugin_instance.get_client_markup('<a href="/page">Page</a>', source_url)
+            self.assertEqual(mock_build.call_count, 4)
+            self.assertIn('href="/page"', relative)
+
+    @patch("requests.Session.get")
+    def test_content_prefetching(self, mock_get):
+        """Test content for all plugins on a page is fetched before they render"""
+        from django.test import RequestFactory
+        from django.template.response import TemplateResponse
+        from cms.api import create_page
+        from cms.utils.conf import get_cms_setting
+        from .middleware import RemoteContentPrefetchMiddleware
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        template = get_cms_setting('TEMPLATES')[0][0]
+        page = create_page("Test", template, "en")
+        page.placeholders.add(self.placeholder)
+        add_plugin(self.placeholder, RemoteContentPlugin, "en", remote_path="/news")
+        add_plugin(self.placeholder, RemoteContentPlugin, "en", remote_path="/news")
+
+        request = RequestFactory().get('/')
+        request.current_page = page
+        response = TemplateResponse(request, template)
+        middleware = RemoteContentPrefetchMiddleware(lambda request: response)
+        middleware.process_template_response(request, response)
+
+        self.assertEqual(set(request.remote_content_prefetch), {
+            f"{defaults.NETLOC}about/about-tacc",
+            f"{defaults.NETLOC}news",
+        })
+        for future in request.remote_content_prefetch.values():
+            self.assertEqual(future.result(), "<div>Test Content</div>")
+        self.assertEqual(mock_get.call_count, 2)
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_CACHE_TIMEOUT=0):
+            context = self.plugin_instance.render({'request': request}, self.plugin, None)
+        self.assertEqual(context['markup'], "<div>Test Content</div>")
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("requests.Session.get")
+    def test_warm_remote_content_command(self, mock_get):
+        """Test command fetches, transforms, and caches content of published plugins"""
+        from io import StringIO
+        from django.core.management import call_command
+        from cms.api import create_page
+        from cms.utils.conf import get_cms_setting
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = '<a href="/about">About</a>'
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        page = create_page("Test", get_cms_setting('TEMPLATES')[0][0], "en")
+        placeholder = page.placeholders.get_or_create(slot="test")[0]
+        add_plugin(placeholder, RemoteContentPlugin, "en", remote_path="/news")
+        add_plugin(placeholder, RemoteContentPlugin, "en", remote_path="/news/")
+        add_plugin(placeholder, RemoteContentPlugin, "en", remote_path="news/", cache_timeout=600)
+        add_plugin(placeholder, RemoteContentPlugin, "en", remote_path="/news/", cache_timeout=7200)
+        page.publish("en")
+
+        for processes in (0, 1):
+            with self.subTest(processes=processes):
+                cache.get_cache().clear()
+                mock_get.reset_mock()
+                stdout = StringIO()
+                with patch.object(
+                    RemoteContentPlugin, 'set_source_entry', autospec=True,
+                    side_effect=RemoteContentPlugin.set_source_entry,
+                ) as mock_set:
+                    call_command('warm_remote_content', processes=processes, stdout=stdout)
+
+                # Only URLs of published plugins, without duplicates
+                self.assertEqual(mock_get.call_count, 2)
+                # Cached as long as the instance that caches longest
+                cache_timeouts = {call.args[1]: call.args[3] for call in mock_set.call_args_list}
+                self.assertEqual(cache_timeouts, {
+                    f"{defaults.NETLOC}news": None,
+                    f"{defaults.NETLOC}news/": 7200,
+                })
+                self.assertIn("Warmed 2 URLs", stdout.getvalue())
+                for url in (f"{defaults.NETLOC}news", f"{defaults.NETLOC}news/"):
+                    self.assertIn(url, stdout.getvalue())
+                    self.assertIsNotNone(cache.get_entry('source', url))
+                    client_markup = self.plugin_instance.get_cached_client_markup(mock_response.text, url)
+                    self.assertIn(f'href="{defaults.NETLOC}about"', client_markup)
+
+    def test_benchmark_remote_content_command(self):
+        """Test command times benchmarks, and reports regressions from a baseline"""
+        import json
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        self.addCleanup(os.remove, output)
+        options = {'sizes': [10], 'selectors': [0, 1], 'repeat': 1, 'latency': 0, 'stdout': StringIO()}
+
+        call_command('benchmark_remote_content', output=output, **options)
+        with open(output) as file:
+            results = json.load(file)
+        for name in ('build_client_markup/10kb/stream', 'build_client_markup/10kb/selectors-1',
+                     'should_keep_relative/10kb/selectors-1', 'transform_srcset/candidates-5', 'render/10kb'):
+            self.assertGreater(results['results'][name]['median'], 0)
+
+        stdout = StringIO()
+        call_command('benchmark_remote_content', baseline=output, tolerance=100, **{**options, 'stdout': stdout})
+        self.assertIn("No regressions", stdout.getvalue())
+
+        for result in results['results'].values():
+            result['median'] /= 1000
+        with open(output, 'w') as file:
+            json.dump(results, file)
+        with self.assertRaises(CommandError):
+            call_command('benchmark_remote_content', baseline=output, **options)
+
+    @override_settings(PORTAL_PLUGIN_CONTENT_BREAKER_THRESHOLD=3, PORTAL_PLUGIN_CONTENT_BREAKER_COOLDOWN=30)
+    @patch("requests.Session.get")
+    def test_circuit_breaker(self, mock_get):
+        """Test requests to a failing origin stop until cooldown, then one is tried"""
+        url = "https://example.com/about"
+        mock_get.side_effect = requests.ConnectionError()
+
+        # Closed: failures are counted
+        for _ in range(3):
+            self.assertIsNone(self.plugin_instance.get_source_response(url))
+        self.assertEqual(mock_get.call_count, 3)
+
+        # Open: requests are not sent, to this origin only
+        self.assertIsNone(self.plugin_instance.get_source_response(url))
+        self.assertEqual(mock_get.call_count, 3)
+        self.plugin_instance.get_source_response("https://other.example.com/")
+        self.assertEqual(mock_get.call_count, 4)
+
+        # Half-open: after cooldown, only one request is tried (in any process)
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_get.side_effect = None
+        mock_get.return_value = mock_response
+        later = time.time() + 31
+        with patch(f"{breaker.__name__}.time.time", return_value=later):
+            breaker.reset()
+            self.assertTrue(breaker.allow_request(url))
+            self.assertFalse(breaker.allow_request(url))
+            cache.delete_entry('breaker-trial', "https://example.com")
+            self.assertIs(self.plugin_instance.get_source_response(url), mock_response)
+        self.assertEqual(mock_get.call_count, 5)
+
+        # Closed: after trial succeeds
+        self.assertIsNone(cache.get_entry('breaker', "https://example.com"))
+        self.assertIs(self.plugin_instance.get_source_response(url), mock_response)
+
+    @patch("requests.Session.get")
+    def test_fetch_coalescing(self, mock_get):
+        """Test concurrent fetches of the same uncached URL send one request"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        def get(url, **kwargs):
+            time.sleep(0.2)
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.text = "<div>Test Content</div>"
+            mock_response.headers = {}
+            return mock_response
+        mock_get.side_effect = get
+
+        url = "https://example.com/about"
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: self.plugin_instance.fetch_source_markup(url), range(8)))
+
+        self.assertEqual(results, ["<div>Test Content</div>"] * 8)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @override_settings(PORTAL_PLUGIN_CONTENT_COALESCE_POLL_INTERVAL=0.01)
+    @patch("requests.Session.get")
+    def test_fetch_coalescing_across_processes(self, mock_get):
+        """Test a fetch waits on a fetch of the same URL by another process"""
+        url = "https://example.com/about"
+        cache.add_entry('flight', f"source|{url}", True, 10)
+
+        def fetch_in_other_process():
+            time.sleep(0.1)
+            self.plugin_instance.set_source_entry(url, {'markup': "<div>Test Content</div>"})
+            cache.delete_entry('flight', f"source|{url}")
+        other_process = threading.Thread(target=fetch_in_other_process)
+        other_process.start()
+
+        self.assertEqual(self.plugin_instance.fetch_source_markup(url), "<div>Test Content</div>")
+        other_process.join()
+        mock_get.assert_not_called()
+
+    @override_settings(PORTAL_PLUGIN_CONTENT_COALESCE_POLL_INTERVAL=0.01)
+    @patch("requests.Session.get")
+    def test_fetch_coalescing_across_processes_without_result(self, mock_get):
+        """Test a fetch waits on a fetch by another process, then fetches itself if that caches no content"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {'Cache-Control': 'no-store'}
+        mock_get.return_value = mock_response
+
+        url = "https://example.com/about"
+        cache.add_entry('flight', f"source|{url}", True, 10)
+
+        def fetch_in_other_process():
+            time.sleep(0.1)
+            self.plugin_instance.set_source_entry(url, {'no_store': True})
+            cache.delete_entry('flight', f"source|{url}")
+        other_process = threading.Thread(target=fetch_in_other_process)
+        other_process.start()
+
+        self.assertEqual(self.plugin_instance.fetch_source_markup(url), "<div>Test Content</div>")
+        other_process.join()
+        self.assertEqual(mock_get.call_count, 1)
 
     def test_url_building_path_formats(self):
         """Test URL building with various path formats"""
@@ -111,18 +598,299 @@ class RemoteContentPluginTests(TestCase):
         full_url2 = self.plugin_instance.build_source_url(instance2)
         self.assertEqual(full_url2, "https://example.com/path/no/leading/slash")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_content_rendering(self, mock_get):
         """Test that plugin correctly renders fetched content"""
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {}
         mock_get.return_value = mock_response
 
         context = self.plugin_instance.render({}, self.plugin, None)
         html = self.renderer.render_plugin(self.plugin, context)
         self.assertIn("Test Content", html)
 
+    @patch("requests.Session.get")
+    def test_snapshot_rendering(self, mock_get):
+        """Test the last successfully rendered content is rendered if fetching fails"""
+        from datetime import timedelta
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_CACHE_TIMEOUT=0):
+            context = self.plugin_instance.render({}, self.plugin, None)
+            self.assertEqual(context['markup'], "<div>Test Content</div>")
+
+            instance = RemoteContent.objects.get(pk=self.plugin.pk)
+            self.assertEqual(instance.snapshot_markup, "<div>Test Content</div>")
+            self.assertIsNotNone(instance.snapshot_fetched_at)
+
+            mock_get.side_effect = requests.ConnectionError()
+            context = self.plugin_instance.render({}, instance, None)
+            self.assertEqual(context['markup'], "<div>Test Content</div>")
+
+            instance.snapshot_fetched_at -= timedelta(seconds=defaults.SNAPSHOT_MAX_AGE + 1)
+            context = self.plugin_instance.render({}, instance, None)
+            self.assertIsNone(context.get('markup'))
+
+            with self.settings(PORTAL_PLUGIN_CONTENT_SNAPSHOT_MAX_AGE=None):
+                context = self.plugin_instance.render({}, instance, None)
+                self.assertEqual(context['markup'], "<div>Test Content</div>")
+
+    @patch("requests.Session.get")
+    def test_snapshot_writes(self, mock_get):
+        """Test rendering unchanged content does not store its snapshot on every render"""
+        from datetime import timedelta
+        from .cms_plugins import SNAPSHOT_MIN_INTERVAL
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_CACHE_TIMEOUT=0):
+            instance = RemoteContent.objects.get(pk=self.plugin.pk)
+            with self.assertNumQueries(1):
+                self.plugin_instance.render({}, instance, None)
+            with self.assertNumQueries(0):
+                self.plugin_instance.render({}, instance, None)
+
+            # Stored again once old
+            instance.snapshot_fetched_at -= timedelta(seconds=SNAPSHOT_MIN_INTERVAL + 1)
+            with self.assertNumQueries(1):
+                self.plugin_instance.render({}, instance, None)
+
+            # Stored again once changed
+            mock_response.text = "<div>New Content</div>"
+            with self.assertNumQueries(1):
+                self.plugin_instance.render({}, instance, None)
+            self.assertEqual(RemoteContent.objects.get(pk=self.plugin.pk).snapshot_markup, "<div>New Content</div>")
+
+    @patch("requests.Session.get")
+    def test_deferred_rendering(self, mock_get):
+        """Test a deferred plugin renders a placeholder, whose content loads from a cacheable view"""
+        from django.test import RequestFactory
+        from django.urls import NoReverseMatch, reverse
+        from cms.api import create_page
+        from cms.utils.conf import get_cms_setting
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        self.plugin.render_mode = RemoteContent.RENDER_DEFERRED
+        self.plugin.save()
+        fragment_url = reverse('remote_content_fragment', args=[self.plugin.pk])
+
+        request = RequestFactory().get('/', {'page': '2', 'utm_source': 'email'})
+        context = self.plugin_instance.render({'request': request}, self.plugin, None)
+        self.assertEqual(context['fragment_url'], f"{fragment_url}?page=2")
+        self.assertNotIn('markup', context)
+        html = self.renderer.render_plugin(self.plugin, context)
+        self.assertIn(f'data-remote-content-url="{fragment_url}?page=2"', html)
+        mock_get.assert_not_called()
+
+        response = self.client.get(fragment_url, {'page': '2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Test Content")
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn(f"max-age={defaults.CACHE_TIMEOUT}", response['Cache-Control'])
+        self.assertEqual(mock_get.call_args[0][0], f"{defaults.NETLOC}about/about-tacc?page=2")
+
+        response = self.client.get(fragment_url, {'page': '2'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        cache.get_cache().clear()
+        mock_get.side_effect = requests.ConnectionError()
+        with self.settings(PORTAL_PLUGIN_CONTENT_SNAPSHOT_MAX_AGE=0):
+            response = self.client.get(fragment_url)
+        self.assertEqual(response.status_code, 502)
+        self.assertIn('no-store', response['Cache-Control'])
+
+        # Content of unpublished pages is not public
+        page = create_page("Test", get_cms_setting('TEMPLATES')[0][0], "en")
+        placeholder = page.placeholders.get_or_create(slot="test")[0]
+        draft = add_plugin(placeholder, RemoteContentPlugin, "en", remote_path="/news")
+        response = self.client.get(reverse('remote_content_fragment', args=[draft.pk]))
+        self.assertEqual(response.status_code, 404)
+
+        # Without URLs to load content from, content renders inline
+        mock_get.side_effect = None
+        with patch('djangocms_tacc_remote_content.cms_plugins.reverse', side_effect=NoReverseMatch), \
+                self.assertLogs('portal.djangocms_tacc_remote_content.cms_plugins', 'WARNING'):
+            context = self.plugin_instance.render({}, self.plugin, None)
+        self.assertNotIn('fragment_url', context)
+        self.assertIsNotNone(context['markup'])
+
+    @patch("requests.Session.get")
+    def test_warm_on_save(self, mock_get):
+        """Test saving a plugin fetches and transforms its content into cache, and shows how that went"""
+        from django.test import RequestFactory
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = '<a href="/about">About</a>'
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+        url = self.plugin_instance.build_source_url(self.plugin)
+        request = RequestFactory().post('/')
+
+        executor = MagicMock()
+        executor.submit.side_effect = lambda function, *args: function(*args)
+        with patch.object(client, 'get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.plugin_instance.save_model(request, self.plugin, None, True)
+
+            self.assertEqual(cache.get_entry('source', url)['markup'], mock_response.text)
+            client_markup = self.plugin_instance.get_cached_client_markup(mock_response.text, url)
+            self.assertIn(f'href="{defaults.NETLOC}about"', client_markup)
+            self.assertIn("Reachable in", self.plugin_instance.full_url(self.plugin))
+            self.assertIn("26\xa0bytes", self.plugin_instance.full_url(self.plugin))
+
+            mock_get.side_effect = requests.ConnectionError()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.plugin_instance.save_model(request, self.plugin, None, True)
+            self.assertIn("Unreachable after", self.plugin_instance.full_url(self.plugin))
+
+            executor.reset_mock()
+            with self.settings(PORTAL_PLUGIN_CONTENT_WARM_ON_SAVE=False), \
+                    self.captureOnCommitCallbacks(execute=True):
+                self.plugin_instance.save_model(request, self.plugin, None, True)
+            executor.submit.assert_not_called()
+
+            # Content of an instance that never caches is fetched, but not cached
+            mock_get.side_effect = None
+            cache.get_cache().clear()
+            self.plugin.never_cache = True
+            with self.captureOnCommitCallbacks(execute=True):
+                self.plugin_instance.save_model(request, self.plugin, None, True)
+            self.assertEqual(mock_get.call_count, 3)
+            self.assertIsNone(cache.get_entry('source', url))
+            self.assertIsNone(self.plugin_instance.get_cached_client_markup(mock_response.text, url))
+            self.assertIn("Reachable in", self.plugin_instance.full_url(self.plugin))
+
+    @patch("requests.Session.get")
+    def test_invalidation_webhook(self, mock_get):
+        """Test a signed request invalidates cached content of matching paths, and nothing else"""
+        import json
+        from django.urls import reverse
+        from . import webhook
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = '<a href="/about">About</a>'
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        urls = [
+            f"{defaults.NETLOC}about/about-tacc",
+            f"{defaults.NETLOC}about/about-tacc?page=2",
+            f"{defaults.NETLOC}news/latest/",
+            f"{defaults.NETLOC}news-archive/",
+        ]
+        for url in urls:
+            source_markup = self.plugin_instance.fetch_source_markup(url)
+            self.plugin_instance.get_client_markup(source_markup, url)
+        identity = self.plugin_instance.get_client_markup_identity(mock_response.text, urls[0])
+        self.assertIsNotNone(cache.get_entry('client', identity))
+
+        def post(data, secret='secret', timestamp=None):
+            body = json.dumps(data).encode('utf-8')
+            timestamp = str(timestamp or int(time.time()))
+            return self.client.post(
+                reverse('remote_content_invalidate'), body, content_type='application/json',
+                HTTP_X_REMOTE_CONTENT_TIMESTAMP=timestamp,
+                HTTP_X_REMOTE_CONTENT_SIGNATURE=webhook.get_signature(secret, timestamp, body),
+            )
+
+        data = {'paths': ['/about/about-tacc'], 'prefixes': ['/news/']}
+        self.assertEqual(post(data).status_code, 404)
+        with self.settings(PORTAL_PLUGIN_CONTENT_WEBHOOK_SECRET='secret'):
+            self.assertEqual(post(data, secret='wrong').status_code, 403)
+            self.assertEqual(post(data, timestamp=int(time.time()) - 3600).status_code, 403)
+            self.assertEqual(post({'paths': '/about/'}).status_code, 400)
+
+            with patch.object(Placeholder, 'clear_cache') as mock_clear_cache:
+                response = post(data)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sorted(response.json()['invalidated']), sorted(urls[:3]))
+            # Only the placeholder of the plugin of an invalidated path
+            mock_clear_cache.assert_called_once_with("en")
+
+        for url in urls[:3]:
+            self.assertIsNone(cache.get_entry('source', url))
+        self.assertIsNone(cache.get_entry('client', identity))
+        self.assertIsNotNone(cache.get_entry('source', urls[3]))
+        self.assertEqual(list(cache.get_index('source')), urls[3:])
+
+    def test_index_lifetime(self):
+        """Test an index lives as long as its longest-lived entry, whichever entry was added last"""
+        long_url, short_url = "https://example.com/archive/", "https://example.com/news/"
+        with patch.object(cache, 'set_entry', wraps=cache.set_entry) as mock_set_entry:
+            cache.add_to_index('source', long_url, 3 * 60 * 60)
+            cache.add_to_index('source', short_url, 360)
+            cache.add_to_index('source', short_url, 360)
+            cache.remove_from_index('source', [short_url])
+        timeouts = [call.args[3] for call in mock_set_entry.call_args_list if call.args[0] == 'index']
+        self.assertEqual(len(timeouts), 3)
+        self.assertTrue(all(timeout > 3 * 60 * 60 for timeout in timeouts))
+        self.assertEqual(list(cache.get_index('source')), [long_url])
+
+    @patch("requests.Session.get")
+    def test_render_metrics(self, mock_get):
+        """Test each phase of rendering is measured, and counted if enabled"""
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.text = "<div>Test Content</div>"
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        rendered = []
+        def on_render(sender, **kwargs):
+            rendered.append(kwargs)
+        signals.content_rendered.connect(on_render)
+        self.addCleanup(signals.content_rendered.disconnect, on_render)
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_METRICS=True):
+            self.plugin_instance.render({}, self.plugin, None)
+            self.plugin_instance.render({}, self.plugin, None)
+
+        self.assertEqual(len(rendered), 2)
+        self.assertEqual(rendered[0]['url'], self.plugin_instance.build_source_url(self.plugin))
+        self.assertEqual(rendered[0]['cache'], {'source': 'miss', 'client': 'miss'})
+        self.assertEqual(rendered[1]['cache'], {'source': 'hit', 'client': 'hit'})
+        self.assertLessEqual({'build_url', 'fetch', 'rewrite', 'render'}, set(rendered[0]['timings']))
+        self.assertEqual(rendered[0]['bytes_in'], len("<div>Test Content</div>"))
+        self.assertEqual(rendered[0]['bytes_out'], len("<div>Test Content</div>"))
+
+        snapshot = metrics.registry.get_snapshot()
+        self.assertEqual(snapshot['counters']['renders'], 2)
+        self.assertEqual(snapshot['counters']['cache.source.hit'], 1)
+        self.assertEqual(snapshot['histograms']['phase.render']['count'], 2)
+
+        # Not counted unless enabled
+        self.plugin_instance.render({}, self.plugin, None)
+        self.assertEqual(metrics.registry.get_snapshot()['counters']['renders'], 2)
+
+        url = reverse('admin:remote_content_metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.assertContains(self.client.get(url), 'phase.render')
+        self.assertEqual(self.client.get(url, {'format': 'json'}).json()['counters']['renders'], 2)
+
     def test_path_transformation(self):
         """Test that relative and absolute paths are transformed correctly"""
         test_selectors = ['.pagination a', '[data-use-relative-url]']
@@ -202,6 +970,38 @@ class RemoteContentPluginTests(TestCase):
             expected_srcset_url = urljoin(defaults.NETLOC, '/images/relative-in-srcset.jpg')
             self.assertEqual(img_independent['srcset'], f"{expected_srcset_url} 1x")
 
+    def test_path_transformation_selector_cost(self):
+        """Test that relative-path selectors are evaluated together, once per document"""
+        test_selectors = ['.pagination a', '[data-use-relative-url]', 'img.local-asset']
+        item_markup = '<a href="/news/{0}/">News {0}</a><img src="/images/{0}.jpg" srcset="/images/{0}-2x.jpg 2x">'
+
+        for item_count in (10, 500):
+            with self.subTest(item_count=item_count):
+                test_markup = '<div>' + ''.join(item_markup.format(i) for i in range(item_count)) + '</div>'
+                with self.settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=test_selectors), \
+                        patch.object(SoupSieve, 'select', autospec=True, side_effect=SoupSieve.select) as mock_select:
+                    self.plugin_instance.build_client_markup(test_markup, defaults.NETLOC)
+                self.assertEqual(mock_select.call_count, 1)
+
+    def test_transform_plan(self):
+        """Test plans are built once per setting value, and resolve URLs like urljoin"""
+        source_url = "https://example.com/news/latest/?page=2"
+        with self.settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=['.a', '.b']):
+            plan = self.plugin_instance.get_transform_plan()
+            self.assertIs(self.plugin_instance.get_transform_plan(), plan)
+            self.assertIs(self.plugin_instance.get_transform_plan(['.a', '.b']), plan)
+            self.assertIsNot(self.plugin_instance.get_transform_plan(['.a']), plan)
+            self.assertEqual(plan.use_relative, ('.a', '.b'))
+            soup = BeautifulSoup('<p class="a"></p><p class="b"></p><p class="c"></p>', 'html.parser')
+            self.assertEqual(len(plan.select_relative_elements(soup)), 2)
+        with self.settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=['.a', '.b']):
+            # Rebuilt after setting changed
+            self.assertIsNot(self.plugin_instance.get_transform_plan(), plan)
+
+        for url in ('/about/', '/a/../b/', '/./c', 'story/', './story/', '../', '?page=3', '/x?y=1#z', '/a//b'):
+            with self.subTest(url=url):
+                self.assertEqual(plans.resolve_url(source_url, url), urljoin(source_url, url))
+
     def test_query_parameter_handling(self):
         """Test handling of query parameters in URLs"""
         from django.test import RequestFactory
@@ -229,6 +1029,62 @@ class RemoteContentPluginTests(TestCase):
                 for param in unexpected_params:
                     self.assertNotIn(param, url, f"Unexpected parameter '{param}' found in URL: {url}")
 
+    def test_query_parameter_forwarding(self):
+        """Test query parameters are forwarded canonically, per allowlist"""
+        from django.test import RequestFactory
+
+        request = RequestFactory().get('/?utm_source=x&tag=a b&page=2&fbclid=y&edit&tag=%26c')
+        instance = RemoteContent(remote_path="/news?template=plain.html")
+
+        url = self.plugin_instance.build_source_url(instance, request)
+        self.assertEqual(url, f"{defaults.NETLOC}news?template=plain.html&page=2&tag=%26c&tag=a+b")
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_FORWARD_PARAMS=['page']):
+            url = self.plugin_instance.build_source_url(instance, request)
+            self.assertEqual(url, f"{defaults.NETLOC}news?template=plain.html&page=2")
+
+            instance.forward_params = "tag, utm_source"
+            url = self.plugin_instance.build_source_url(instance, request)
+            self.assertEqual(url, f"{defaults.NETLOC}news?template=plain.html&tag=%26c&tag=a+b")
+
+        # Same parameters in another order build the same URL
+        reordered_request = RequestFactory().get('/?tag=%26c&page=2&tag=a b')
+        self.assertEqual(
+            self.plugin_instance.build_source_url(RemoteContent(remote_path="/news"), reordered_request),
+            self.plugin_instance.build_source_url(RemoteContent(remote_path="/news"), request),
+        )
+
+    def test_query_parameter_cache_variation(self):
+        """Test cached placeholders vary by query parameters that might be forwarded"""
+        from django.test import RequestFactory
+        from cms.utils.helpers import get_header_name
+        from .cms_plugins import QUERY_HEADER
+        from .middleware import RemoteContentQueryMiddleware
+
+        self.assertEqual(self.plugin_instance.get_vary_cache_on(None, self.plugin, None), [QUERY_HEADER])
+
+        middleware = RemoteContentQueryMiddleware(lambda request: None)
+        headers = []
+        for query in ('', '?utm_source=x', '?page=2&toolbar_on', '?toolbar_off&page=2'):
+            request = RequestFactory().get(f'/{query}')
+            middleware(request)
+            headers.append(request.META[get_header_name(QUERY_HEADER)])
+        self.assertEqual(headers, ['', '', 'page=2', 'page=2'])
+
+        # Only parameters that the setting, or an instance, allows
+        headers = []
+        with self.settings(PORTAL_PLUGIN_CONTENT_FORWARD_PARAMS=['page']):
+            for query in ('?page=2&nonce=1', '?page=2&nonce=2', '?page=2&tag=a'):
+                request = RequestFactory().get(f'/{query}')
+                middleware(request)
+                headers.append(request.META[get_header_name(QUERY_HEADER)])
+            self.plugin.forward_params = 'tag'
+            self.plugin.save()
+            request = RequestFactory().get('/?page=2&tag=a&nonce=1')
+            middleware(request)
+            headers.append(request.META[get_header_name(QUERY_HEADER)])
+        self.assertEqual(headers, ['page=2', 'page=2', 'page=2', 'page=2&tag=a'])
+
     def test_transform_srcset(self):
         """Test transform_srcset function with various srcset formats"""
         source_site = "https://example.com"
@@ -335,6 +1191,149 @@ class RemoteContentPluginTests(TestCase):
         self.assertEqual(local_link['href'], f'{source_site}/local/page')
         self.assertEqual(local_link['target'], '_blank')
 
+    def test_url_attribute_rules(self):
+        """Test that more attributes can be transformed by adding rules"""
+        class PosterPlugin(RemoteContentPlugin):
+            url_attribute_rules = RemoteContentPlugin.url_attribute_rules + (
+                ('poster', 'transform_url', {}),
+            )
+
+        source_url = "https://example.com/"
+        test_markup = '<video src="/video.mp4" poster="/poster.jpg"></video>'
+        result = PosterPlugin().build_client_markup(test_markup, source_url)
+        video = BeautifulSoup(result, 'html.parser').find('video')
+
+        self.assertEqual(video['src'], 'https://example.com/video.mp4')
+        self.assertEqual(video['poster'], 'https://example.com/poster.jpg')
+        self.assertEqual(video['crossorigin'], 'anonymous')
+
+    def test_parser_backends(self):
+        """Test that every installed parser transforms URLs the same way"""
+        source_url = "https://example.com/news/"
+        test_markup = '''
+            <link rel="stylesheet" href="/css/news.css">
+            <div class="news">
+                <nav class="pagination"><a href="?page=2">Next &gt;</a></nav>
+                <a href="./article/">Article</a>
+                <a href="#top">Top</a>
+                <img src="../images/photo.jpg" srcset="/images/photo-576.jpg 576w, //cdn.example.com/photo.jpg 992w">
+                <img src="/images/local.jpg" data-use-relative-url>
+            </div>
+        '''
+
+        def get_urls(markup):
+            soup = BeautifulSoup(markup, 'html.parser')
+            self.assertIsNone(soup.find(['html', 'head', 'body']))
+            return sorted(
+                (tag.name, attribute, tag[attribute], tag.get('crossorigin'), tag.get('target'))
+                for tag in soup.find_all(True)
+                for attribute in ('src', 'srcset', 'href') if tag.has_attr(attribute)
+            )
+
+        test_selectors = ['.pagination a', '[data-use-relative-url]']
+        with self.settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=test_selectors):
+            expected_urls = get_urls(self.plugin_instance.build_client_markup(test_markup, source_url))
+            for parser in ('html.parser', 'lxml', 'html5lib'):
+                with self.subTest(parser=parser), self.settings(PORTAL_PLUGIN_CONTENT_PARSER=parser):
+                    if self.plugin_instance.get_parser() != parser:
+                        self.skipTest(f"{parser} is not installed")
+                    result = self.plugin_instance.build_client_markup(test_markup, source_url)
+                    self.assertEqual(get_urls(result), expected_urls)
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_PARSER=['not-a-parser', 'html.parser']):
+            self.assertEqual(self.plugin_instance.get_parser(), 'html.parser')
+
+    def test_streaming_transformation(self):
+        """Test that streaming transforms URLs like the tree does, without selectors"""
+        source_url = "https://example.com/news/"
+        test_markup = '''
+            <!DOCTYPE html>
+            <link rel="stylesheet" href="/css/news.css">
+            <script>document.write('<a href="/not/a/tag">');</script>
+            <!-- <a href="/commented/out"> -->
+            <div class="news" data-flag>
+                <a href="./article/?a=1&amp;b=2" title="&quot;Quoted&quot; &amp; more">Article &amp; more &#169;</a>
+                <a href="#top">Top</a>
+                <img src="../images/photo.jpg" srcset="/images/photo-576.jpg 576w, //cdn.example.com/photo.jpg 992w" />
+                <img src="https://example.com/absolute.jpg" alt="">
+            </div>
+        '''
+
+        def get_tags(markup):
+            soup = BeautifulSoup(markup, 'html.parser')
+            return [(tag.name, sorted(tag.attrs.items()), tag.string) for tag in soup.find_all(True)]
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=[]):
+            tree_result = self.plugin_instance.build_client_markup(test_markup, source_url)
+        with self.settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=False), \
+                patch(f"{RemoteContentPlugin.__module__}.BeautifulSoup") as mock_soup:
+            stream_result = self.plugin_instance.build_client_markup(test_markup, source_url)
+            mock_soup.assert_not_called()
+        self.assertEqual(get_tags(stream_result), get_tags(tree_result))
+        self.assertIn('<img src="https://example.com/absolute.jpg" alt="">', stream_result)
+        self.assertIn('<!-- <a href="/commented/out"> -->', stream_result)
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=True):
+            self.assertEqual(self.plugin_instance.build_client_markup(test_markup, source_url), test_markup)
+
+    def test_content_selector(self):
+        """Test that only content matched by a selector is transformed and returned"""
+        source_url = "https://example.com/news/"
+        test_markup = '''
+            <html><head><link rel="stylesheet" href="/css/news.css"></head><body>
+            <nav><a href="/">Home</a></nav>
+            <main>
+                <article class="story lead"><a href="./lead/">Lead</a></article>
+                <article class="story"><a href="./second/">Second</a>
+                    <article class="story"><a href="./nested/">Nested</a></article>
+                </article>
+            </main>
+            </body></html>
+        '''
+
+        def get_hrefs(markup):
+            return [a['href'] for a in BeautifulSoup(markup, 'html.parser').find_all('a')]
+
+        for parser in ('html.parser', 'lxml', 'html5lib'):
+            with self.subTest(parser=parser), self.settings(PORTAL_PLUGIN_CONTENT_PARSER=parser):
+                if self.plugin_instance.get_parser() != parser:
+                    self.skipTest(f"{parser} is not installed")
+                # A simple selector, which is strained while parsing
+                result = self.plugin_instance.build_client_markup(test_markup, source_url, 'article.story')
+                self.assertEqual(get_hrefs(result), [
+                    f"{source_url}lead/", f"{source_url}second/", f"{source_url}nested/",
+                ])
+                self.assertEqual(result.count('<article'), 3)
+                self.assertNotIn('<main', result)
+                # A complex selector, which is not
+                result = self.plugin_instance.build_client_markup(test_markup, source_url, 'main > .lead')
+                self.assertEqual(get_hrefs(result), [f"{source_url}lead/"])
+
+        self.assertIsNotNone(self.plugin_instance.get_content_strainer('div#main.a.b'))
+        self.assertIsNone(self.plugin_instance.get_content_strainer('main article'))
+        self.assertIsNone(self.plugin_instance.build_client_markup(test_markup, source_url, '.missing'))
+        with self.assertLogs('portal.djangocms_tacc_remote_content.cms_plugins', 'ERROR'):
+            self.assertIsNone(self.plugin_instance.build_client_markup(test_markup, source_url, 'div['))
+
+        from django.forms import modelform_factory
+        from .forms import RemoteContentForm
+        # As the admin builds the form of the plugin
+        form_class = modelform_factory(RemoteContent, form=RemoteContentForm, fields=['remote_path', 'content_selector', 'render_mode'])
+        for content_selector, is_valid in (('div[', False), ('main > .lead', True), ('', True)):
+            form = form_class(data={
+                'remote_path': '/news/', 'content_selector': content_selector, 'render_mode': RemoteContent.RENDER_INLINE,
+            })
+            self.assertEqual(form.is_valid(), is_valid, content_selector)
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_USE_RELATIVE_PATHS=True):
+            result = self.plugin_instance.build_client_markup(test_markup, source_url, 'nav')
+            self.assertEqual(result, '<nav><a href="/">Home</a></nav>')
+
+        self.assertNotEqual(
+            self.plugin_instance.get_client_markup(test_markup, source_url, 'nav'),
+            self.plugin_instance.get_client_markup(test_markup, source_url, 'main'),
+        )
+
     def test_is_relative_path(self):
         """Test the is_relative_path helper method"""
         # Should return True for relative paths
@@ -421,3 +1420,198 @@ class RemoteContentPluginTests(TestCase):
                 link_absolute = soup.find('a', href=f'{source_site}/absolute/page.html')
                 self.assertIsNotNone(link_absolute, "/absolute/page.html was not correctly resolved")
                 self.assertEqual(link_absolute['href'], f'{source_site}/absolute/page.html')
+
+class StubServerHandler(BaseHTTPRequestHandler):
+    """
+    Serve markup that names its path, after a delay given by `?delay=`,
+    padded to `?size=` bytes, sent in `?chunks=` pieces a `?drip=` apart,
+    or redirect to `?redirect=`
+    """
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        if 'redirect' in query:
+            self.send_response(301)
+            self.send_header('Location', query['redirect'][0])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        time.sleep(float(query.get('delay', [0])[0]))
+        self.server.paths.append(self.path)
+        self.server.cookies.append(self.headers.get('Cookie'))
+        body = f"<div>Content of {self.path}</div>".encode('utf-8')
+        body = body.ljust(int(query.get('size', [0])[0]), b' ')
+        chunks = int(query.get('chunks', [1])[0])
+        chunk_size = -(-len(body) // chunks)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Set-Cookie', 'sessionid=abc; Path=/')
+        if 'hide_length' not in query:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        for start in range(0, len(body), chunk_size):
+            self.wfile.write(body[start:start + chunk_size])
+            self.wfile.flush()
+            time.sleep(float(query.get('drip', [0])[0]))
+
+    def log_message(self, format, *args):
+        pass
+
+class RemoteContentFetchTests(TestCase):
+    """Test fetching content from a local stub server"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubServerHandler)
+        cls.server.daemon_threads = True
+        # Path, and Cookie header, of each request
+        cls.server.paths = []
+        cls.server.cookies = []
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.server_url = f"http://127.0.0.1:{cls.server.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.placeholder = Placeholder.objects.create(slot="test")
+        self.plugin_instance = RemoteContentPlugin()
+        cache.get_cache().clear()
+        breaker.reset()
+
+    def test_fetching(self):
+        """Test content is fetched via a pooled session"""
+        content = self.plugin_instance.get_source_markup(f"{self.server_url}about")
+        self.assertEqual(content, "<div>Content of /about</div>")
+        content = self.plugin_instance.get_source_markup(f"{self.server_url}about?redirect=/about/")
+        self.assertEqual(content, "<div>Content of /about/</div>")
+
+    def test_fetching_without_cookies(self):
+        """Test cookies that the origin sets are not sent with later fetches"""
+        self.server.cookies.clear()
+        self.plugin_instance.get_source_markup(f"{self.server_url}about")
+        self.plugin_instance.get_source_markup(f"{self.server_url}about")
+        self.assertEqual(self.server.cookies, [None, None])
+
+    async def test_async_fetching_without_cookies(self):
+        """Test cookies that the origin sets are not sent with later fetches, without blocking"""
+        self.server.cookies.clear()
+        await self.plugin_instance.aget_source_response(f"{self.server_url}about")
+        await self.plugin_instance.aget_source_response(f"{self.server_url}about")
+        await client.aclose_async_clients()
+        self.assertEqual(self.server.cookies, [None, None])
+
+    def test_fetching_limits(self):
+        """Test fetching stops once content is too large or too slow"""
+        with self.settings(PORTAL_PLUGIN_CONTENT_MAX_BYTES=1000):
+            self.assertIsNotNone(self.plugin_instance.get_source_markup(f"{self.server_url}?size=1000"))
+            # Too large, per header
+            self.assertIsNone(self.plugin_instance.get_source_markup(f"{self.server_url}?size=1001"))
+            # Too large, per body
+            self.assertIsNone(self.plugin_instance.get_source_markup(f"{self.server_url}?size=5000&chunks=5&hide_length"))
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_DEADLINE=0.3):
+            # Too slow, though each chunk is quicker than read timeout
+            start = time.monotonic()
+            self.assertIsNone(self.plugin_instance.get_source_markup(f"{self.server_url}?size=1000&chunks=10&drip=0.1"))
+            self.assertLess(time.monotonic() - start, 0.8)
+
+    async def test_async_fetching_limits(self):
+        """Test fetching without blocking stops once content is too large"""
+        with self.settings(PORTAL_PLUGIN_CONTENT_MAX_BYTES=1000):
+            content = await self.plugin_instance.aget_source_response(f"{self.server_url}?size=1000")
+            self.assertEqual(len(content.text), 1000)
+            content = await self.plugin_instance.aget_source_response(f"{self.server_url}?size=5000&chunks=5&hide_length")
+            self.assertIsNone(content)
+        await client.aclose_async_clients()
+
+    async def test_async_fetching(self):
+        """Test content is fetched without blocking, with or without httpx"""
+        for async_library in (client.httpx, None):
+            with self.subTest(async_library=async_library), patch.object(client, 'httpx', async_library):
+                url = f"{self.server_url}about?library={bool(async_library)}"
+                content = await self.plugin_instance.afetch_source_markup(url)
+                self.assertEqual(content, f"<div>Content of /about?library={bool(async_library)}</div>")
+                # A redirect is followed
+                url = f"{self.server_url}about?redirect=/about/&library={bool(async_library)}"
+                content = await self.plugin_instance.afetch_source_markup(url)
+                self.assertEqual(content, "<div>Content of /about/</div>")
+                await client.aclose_async_clients()
+
+    async def test_async_fetch_coalescing(self):
+        """Test concurrent fetches of the same uncached URL send one request, under ASGI"""
+        self.server.paths.clear()
+        url = f"{self.server_url}about?delay=0.2"
+        results = await asyncio.gather(*(self.plugin_instance.afetch_source_markup(url) for _ in range(4)))
+        await client.aclose_async_clients()
+
+        self.assertEqual(results, ["<div>Content of /about?delay=0.2</div>"] * 4)
+        self.assertEqual(self.server.paths, ["/about?delay=0.2"])
+
+    async def test_async_prefetching(self):
+        """Test content for all plugins on a page is fetched at once, under ASGI"""
+        from django.test import RequestFactory
+        from django.template.response import TemplateResponse
+        from cms.api import create_page
+        from cms.utils.conf import get_cms_setting
+        from .middleware import RemoteContentPrefetchMiddleware
+
+        template = get_cms_setting('TEMPLATES')[0][0]
+        delay = 0.3
+        remote_paths = [f"/news/{i}/?delay={delay}" for i in range(4)]
+
+        @sync_to_async
+        def create_plugins():
+            page = create_page("Test", template, "en")
+            page.placeholders.add(self.placeholder)
+            for remote_path in remote_paths:
+                add_plugin(self.placeholder, RemoteContentPlugin, "en", remote_path=remote_path)
+            return page
+
+        page = await create_plugins()
+        request = RequestFactory().get('/')
+        request.current_page = page
+        response = TemplateResponse(request, template)
+
+        async def get_response(request):
+            return response
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_NETLOC=self.server_url):
+            middleware = RemoteContentPrefetchMiddleware(get_response)
+            start = time.monotonic()
+            await middleware.process_template_response(request, response)
+            results = await asyncio.gather(*(
+                asyncio.wrap_future(future) for future in request.remote_content_prefetch.values()
+            ))
+            elapsed = time.monotonic() - start
+            await client.aclose_async_clients()
+
+        self.assertEqual(sorted(results), sorted(f"<div>Content of {path}</div>" for path in remote_paths))
+        self.assertLess(elapsed, delay * len(remote_paths))
+
+    async def test_async_prefetching_render(self):
+        """Test plugins render prefetched content in Django's thread for sync code, under ASGI"""
+        from asgiref.sync import ThreadSensitiveContext
+        from django.test import RequestFactory
+
+        @sync_to_async
+        def create_plugin():
+            return add_plugin(self.placeholder, RemoteContentPlugin, "en", remote_path="/news/?delay=0.1")
+
+        instance = await create_plugin()
+        plugin = instance.get_plugin_class_instance()
+        request = RequestFactory().get('/')
+
+        with self.settings(PORTAL_PLUGIN_CONTENT_NETLOC=self.server_url, PORTAL_PLUGIN_CONTENT_DEADLINE=5), \
+                patch.object(RemoteContentPlugin, 'fetch_source_markup') as mock_fetch:
+            async with ThreadSensitiveContext():
+                await plugin.aprefetch_source_markup([instance], request)
+                # As Django renders a `TemplateResponse` under ASGI
+                context = await sync_to_async(plugin.render)({'request': request}, instance, None)
+            await client.aclose_async_clients()
+
+        mock_fetch.assert_not_called()
+        self.assertIn("Content of /news/", context['markup'])
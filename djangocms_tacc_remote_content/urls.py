@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import fragment_view, invalidate_view
+
+urlpatterns = [
+    path('remote-content/invalidate/', invalidate_view, name='remote_content_invalidate'),
+    path('remote-content/<int:plugin_id>/', fragment_view, name='remote_content_fragment'),
+]
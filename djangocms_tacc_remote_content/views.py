@@ -0,0 +1,99 @@
+import hashlib
+import json
+import math
+
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import metrics
+from . import webhook
+from .conf import get_setting
+from .models import RemoteContent
+
+def metrics_view(request):
+    """Show metrics of rendering remote content (as JSON, given `?format=json`)"""
+    snapshot = metrics.registry.get_snapshot()
+    if request.GET.get('format') == 'json':
+        return JsonResponse(snapshot)
+    return render(request, 'remote_content_metrics.html', {
+        'title': 'Remote Content Metrics',
+        'is_enabled': metrics.is_enabled(),
+        'counters': snapshot['counters'],
+        'histograms': snapshot['histograms'],
+    })
+
+@require_GET
+def fragment_view(request, plugin_id):
+    """
+    Render content of a plugin instance alone, for a browser to load into a
+    page after the page loads (i.e. for a "Deferred" instance).
+
+    Content is cacheable (by browsers and CDNs) while it is fresh (see
+    `RemoteContentPlugin.get_content_lifetime`), and revalidated by its `ETag`.
+    Content of unpublished pages is only for staff, and is not cached.
+    """
+    instance = get_object_or_404(RemoteContent, pk=plugin_id)
+    page = instance.placeholder.page if instance.placeholder_id else None
+    is_draft = page is not None and page.publisher_is_draft
+    if is_draft and not request.user.is_staff:
+        raise Http404
+
+    plugin = instance.get_plugin_class_instance()
+    context = plugin.render_inline({'request': request}, instance, None)
+    markup = render_to_string(plugin.render_template, context)
+
+    if context.get('markup') is None:
+        response = HttpResponse(markup, status=502)
+        patch_cache_control(response, no_store=True)
+        return response
+
+    etag = f'"{hashlib.sha256(markup.encode("utf-8")).hexdigest()[:32]}"'
+    response = HttpResponse(markup)
+    response['ETag'] = etag
+    lifetime = math.ceil(plugin.get_content_lifetime(request, instance))
+    if is_draft:
+        patch_cache_control(response, private=True, no_cache=True)
+    elif not lifetime:
+        patch_cache_control(response, public=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=lifetime,
+            stale_while_revalidate=get_setting('CACHE_STALE_TIMEOUT'),
+        )
+    return get_conditional_response(request, etag=etag, response=response)
+
+@csrf_exempt
+@require_POST
+def invalidate_view(request):
+    """
+    Forget cached content of remote paths, when the remote site changes them.
+
+    Request must be signed (see `webhook`), and its body must be JSON e.g.
+    `{"paths": ["/news/latest-news/"], "prefixes": ["/news/tag/"]}`.
+    """
+    secret = get_setting('WEBHOOK_SECRET')
+    if not secret:
+        raise Http404
+    if not webhook.is_signed(request, secret):
+        return HttpResponseForbidden('Invalid signature')
+
+    try:
+        data = json.loads(request.body)
+        paths = data.get('paths', [])
+        prefixes = data.get('prefixes', [])
+    except (ValueError, AttributeError):
+        return HttpResponseBadRequest('Invalid JSON')
+    if not isinstance(paths, list) or not isinstance(prefixes, list) or \
+            not all(isinstance(path, str) and path for path in [*paths, *prefixes]):
+        return HttpResponseBadRequest('Paths and prefixes must be non-empty strings')
+
+    # Not imported with module, because plugin module imports this one
+    from .cms_plugins import RemoteContentPlugin
+    urls = RemoteContentPlugin().invalidate_source_markup(paths, prefixes)
+    return JsonResponse({'invalidated': urls})
@@ -0,0 +1,33 @@
+"""
+Verify requests from a remote site, signed with `PORTAL_PLUGIN_CONTENT_WEBHOOK_SECRET`.
+
+A remote site signs a request by sending headers:
+- `X-Remote-Content-Timestamp`: the current Unix time, in seconds
+- `X-Remote-Content-Signature`: "sha256=" and the hex HMAC-SHA256, keyed by
+  the secret, of the timestamp, a ".", and the request body
+"""
+import hashlib
+import hmac
+import time
+
+from .conf import get_setting
+
+TIMESTAMP_HEADER = 'X-Remote-Content-Timestamp'
+SIGNATURE_HEADER = 'X-Remote-Content-Signature'
+
+def get_signature(secret, timestamp, body):
+    """Sign a request body (as bytes) at a time"""
+    message = f"{timestamp}.".encode('utf-8') + body
+    digest = hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+def is_signed(request, secret):
+    """
+    Whether request was signed with secret, recently (within
+    `PORTAL_PLUGIN_CONTENT_WEBHOOK_MAX_AGE`), so it cannot be replayed later
+    """
+    timestamp = request.headers.get(TIMESTAMP_HEADER, '')
+    signature = request.headers.get(SIGNATURE_HEADER, '')
+    if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > get_setting('WEBHOOK_MAX_AGE'):
+        return False
+    return hmac.compare_digest(get_signature(secret, timestamp, request.body), signature)
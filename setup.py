@@ -23,8 +23,15 @@ setup(
         'Django>=3.2',
         'django-cms>=3.7.4,<4',
         'beautifulsoup4>=4.9.3',
+        'soupsieve>=1.9',
         'requests>=2.25.1',
     ],
+    extras_require={
+        'lxml': ['lxml>=4.6.0'],
+        'html5lib': ['html5lib>=1.1'],
+        'async': ['httpx>=0.23.0'],
+        'lz4': ['lz4>=3.1.0'],
+    },
     # SEE: https://pypi.org/classifiers/
     classifiers=[
         'Environment :: Web Environment',